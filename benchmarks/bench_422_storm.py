@@ -0,0 +1,152 @@
+"""
+Per-request cost of rejecting an invalid request, in each adapter.
+
+"result" is an invalid query rejected by the declared parameter, which answers
+without raising. "exception" is the same rejection done through `throw`, the way
+every validation failure used to travel up to `catch_throw`.
+
+    python benchmarks/bench_422_storm.py
+"""
+
+import asyncio
+import timeit
+
+import zangar as z
+
+SCHEMA = z.to.int()
+
+
+def bench(run, number=20000):
+    best = min(timeit.repeat(run, number=number, repeat=5))
+    return best / number * 1e6
+
+
+def bench_django():
+    from django import setup
+    from django.conf import settings
+    from django.http import JsonResponse
+    from django.test import RequestFactory
+    from django_oasis import Resource, input
+    from oasis_shared import throw
+
+    settings.configure()
+    setup()
+
+    class Result(Resource):
+        @input.query("a", SCHEMA)
+        def get(self, request, a): ...
+
+    class Raised(Resource):
+        def get(self, request):
+            try:
+                SCHEMA.parse(request.GET.get("a"))
+            except z.ValidationError as e:
+                throw(
+                    JsonResponse(
+                        {"in": "query", "errors": e.format_errors()}, status=422
+                    )
+                )
+
+    request = RequestFactory().get("/?a=abc")
+    return [
+        (name, bench(lambda view=resource.as_view(): view(request)))
+        for name, resource in (("result", Result), ("exception", Raised))
+    ]
+
+
+def bench_flask():
+    from flask import Flask, jsonify, request
+    from flask_oasis import Resource, input
+    from oasis_shared import throw
+
+    class Result(Resource):
+        @input.query("a", SCHEMA)
+        def get(self, a): ...
+
+    class Raised(Resource):
+        def get(self):
+            try:
+                SCHEMA.parse(request.args.get("a"))
+            except z.ValidationError as e:
+                throw(
+                    (jsonify({"in": "query", "errors": e.format_errors()}), 422),
+                )
+
+    with Flask(__name__).test_request_context("/?a=abc"):
+        return [
+            (name, bench(resource.as_view()))
+            for name, resource in (("result", Result), ("exception", Raised))
+        ]
+
+
+def bench_starlette():
+    from oasis_shared import throw
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse
+    from starlette_oasis import Resource, input
+
+    class Result(Resource):
+        @input.query("a", SCHEMA)
+        async def get(self, request, a): ...
+
+    class Raised(Resource):
+        async def get(self, request: Request):
+            try:
+                SCHEMA.parse(request.query_params.get("a"))
+            except z.ValidationError as e:
+                throw(
+                    JSONResponse(
+                        {"in": "query", "errors": e.format_errors()}, status_code=422
+                    )
+                )
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "query_string": b"a=abc",
+        "headers": [],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b""}  # pragma: no cover
+
+    async def send(message): ...
+
+    async def storm(resource, number):
+        for _ in range(number):
+            await resource(scope, receive, send)
+
+    def run(resource, number=20000):
+        loop = asyncio.new_event_loop()
+        try:
+            best = min(
+                timeit.repeat(
+                    lambda: loop.run_until_complete(storm(resource, number)),
+                    number=1,
+                    repeat=5,
+                )
+            )
+        finally:
+            loop.close()
+        return best / number * 1e6
+
+    return [
+        (name, run(resource))
+        for name, resource in (("result", Result), ("exception", Raised))
+    ]
+
+
+def main():
+    print(f"{'adapter':>10}  {'path':>10}  {'us/request':>10}")
+    for adapter, func in (
+        ("django", bench_django),
+        ("flask", bench_flask),
+        ("starlette", bench_starlette),
+    ):
+        for name, us in func():
+            print(f"{adapter:>10}  {name:>10}  {us:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
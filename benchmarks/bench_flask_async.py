@@ -0,0 +1,55 @@
+"""
+Per-request cost of an async handler in the Flask adapter.
+
+"stock" is the async view run by Flask, with a new event loop for every
+request, "background" is `as_view(background_loop=True)`, which submits the
+handler to an event loop kept running in a thread. "sync" is the same handler
+without async, for reference.
+
+    python benchmarks/bench_flask_async.py
+"""
+
+import asyncio
+import timeit
+
+import zangar as z
+
+
+def bench(run, number=2000):
+    best = min(timeit.repeat(run, number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main():
+    from flask import Flask
+    from flask_oasis import Resource, input
+
+    class Async(Resource):
+        @input.query("a", z.to.int())
+        async def get(self, a):
+            await asyncio.sleep(0)
+            return {"a": a}
+
+    class Sync(Resource):
+        @input.query("a", z.to.int())
+        def get(self, a):
+            return {"a": a}
+
+    app = Flask(__name__)
+    app.add_url_rule("/stock", view_func=Async.as_view())
+    app.add_url_rule(
+        "/background",
+        endpoint="background",
+        view_func=Async.as_view(background_loop=True),
+    )
+    app.add_url_rule("/sync", view_func=Sync.as_view())
+    client = app.test_client()
+
+    print(f"{'mode':>10}  {'us/request':>10}")
+    for mode in ("stock", "background", "sync"):
+        us = bench(lambda path=f"/{mode}?a=1": client.get(path))
+        print(f"{mode:>10}  {us:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Per-request cost of an operation by the number of declarations stacked on it.
+
+All the declarations of an operation are run by one flat invoker, so the cost
+should stay flat as declarations are added instead of growing linearly. The
+query and header parameters are parsed in one pass per location, leaving each of
+them only the validation of its value. "per decl" is what each declaration adds
+over an operation with none: it falls as declarations are added when their
+overhead is flat, and stays put when it grows linearly.
+
+    python benchmarks/bench_operation.py
+"""
+
+import timeit
+
+import zangar as z
+from flask import Flask
+from flask_oasis import MediaType, Resource, input, output
+
+KINDS = ("response", "query", "header")
+
+
+def make_resource(kind: str, n: int):
+    def get(self, **kwargs):
+        return "OK"
+
+    for i in range(n):
+        if kind == "response":
+            # response declarations cost nothing but their bookkeeping, so what
+            # is measured is the overhead of the declarations themselves.
+            get = output.response(200 + i, content={"text/plain": MediaType(z.str())})(
+                get
+            )
+        else:
+            get = getattr(input, kind)(f"p{i}", z.str())(get)
+    return type(f"Resource{kind.title()}{n}", (Resource,), {"get": get})
+
+
+def request_context(app: Flask, n: int):
+    return app.test_request_context(
+        "/",
+        query_string={f"p{i}": str(i) for i in range(n)},
+        headers={f"p{i}": str(i) for i in range(n)},
+    )
+
+
+def measure(app: Flask, kind: str, n: int) -> float:
+    view = make_resource(kind, n).as_view()
+    with request_context(app, n):
+        number = 20000
+        return min(timeit.repeat(view, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    app = Flask(__name__)
+    print(
+        f"{'declarations':>12}"
+        + "".join(f"  {kind + ' us':>11}  {'per decl':>8}" for kind in KINDS)
+    )
+    base = {kind: measure(app, kind, 0) for kind in KINDS}
+    for n in (0, 2, 4, 8, 16, 32):
+        line = f"{n:>12}"
+        for kind in KINDS:
+            us = base[kind] if n == 0 else measure(app, kind, n)
+            per = (us - base[kind]) / n if n else 0.0
+            line += f"  {us:>11.2f}  {per:>+8.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Per-parameter parsing cost of scalar, struct and dataclass parameters, with the
+wrapper struct built on every request (before) and built once (after).
+
+    python benchmarks/bench_parameters.py
+"""
+
+import timeit
+from dataclasses import dataclass, field
+
+import zangar as z
+from oasis_shared import QueryBase
+
+
+@dataclass
+class Paging:
+    page: int = field(default=1, metadata={"zangar": {"schema": z.to.int()}})
+    page_size: int = field(default=10, metadata={"zangar": {"schema": z.to.int()}})
+
+
+class Query(QueryBase):
+    def get_argumentset(self, argumentset):
+        return argumentset
+
+
+def parse_request_per_call(name, schema, required, argumentset):
+    """How parameters were parsed before the wrapper struct was precompiled."""
+    if isinstance(schema, (z.struct, z.dataclass)):
+        argumentset = {name: argumentset}
+    f = z.field(schema)
+    if not required:
+        f = f.optional()
+    return z.struct({name: f}).parse(argumentset)
+
+
+CASES = [
+    ("scalar", z.to.int(), {"page": "2"}),
+    (
+        "struct",
+        z.struct({"page": z.to.int(), "page_size": z.to.int()}),
+        {"page": "2", "page_size": "20"},
+    ),
+    ("dataclass", z.dataclass(Paging), {"page": "2", "page_size": "20"}),
+]
+
+
+def main():
+    number = 20000
+    print(f"{'parameter':>10}  {'before us':>10}  {'after us':>10}")
+    for name, schema, argumentset in CASES:
+        param = Query("page", schema, required=False)
+        before = min(
+            timeit.repeat(
+                lambda: parse_request_per_call("page", schema, False, argumentset),
+                number=number,
+                repeat=5,
+            )
+        )
+        after = min(
+            timeit.repeat(
+                lambda: param.parse_request(argumentset), number=number, repeat=5
+            )
+        )
+        print(
+            f"{name:>10}  {before / number * 1e6:>10.2f}  {after / number * 1e6:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Building the Path Item Objects of a synthetic API of 500 resources, the first
+time (cold) and again once they are cached (warm).
+
+    python benchmarks/bench_spec.py
+"""
+
+import time
+
+import zangar as z
+from flask_oasis import MediaType, Resource, input, output
+
+OPENAPI = "3.0.3"
+
+
+def make_resource(i: int):
+    item = z.struct({"id": z.int(), "name": z.str(), "tags": z.list(z.str())})
+
+    class API(Resource):
+        @input.query("page", z.to.int(), required=False)
+        @input.query("page_size", z.to.int(), required=False)
+        @output.response(200, content={"application/json": MediaType(z.list(item))})
+        def get(self, page=1, page_size=10): ...
+
+        @input.body("data", content={"application/json": MediaType(item)})
+        @output.response(201, content={"application/json": MediaType(item)})
+        def post(self, data): ...
+
+    API.__name__ = f"API{i}"
+    return API
+
+
+def main():
+    resources = [make_resource(i) for i in range(500)]
+
+    start = time.perf_counter()
+    for resource in resources:
+        resource.spec(OPENAPI)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for resource in resources:
+        resource.spec(OPENAPI)
+    warm = time.perf_counter() - start
+
+    print(f"cold: {cold * 1e3:.2f} ms")
+    print(f"warm: {warm * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Throughput of the Starlette adapter with sync and async handlers mixed.
+
+Each handler validates a query parameter and waits 1ms, "async" with
+`asyncio.sleep`, "sync" with a blocking `time.sleep` in a worker thread. The
+requests are sent concurrently to the ASGI app and the throughput is reported
+for each mix of the two, and for sync handlers under `max_sync_threads`.
+
+    python benchmarks/bench_sync_handlers.py
+"""
+
+import asyncio
+import time
+
+import zangar as z
+
+REQUESTS = 2000
+CONCURRENCY = 100
+WAIT = 0.001
+
+
+def make_resource(max_sync_threads=None):
+    from starlette.responses import Response
+    from starlette_oasis import Resource, input
+
+    class MyResource(Resource):
+        @input.query("a", z.to.int())
+        async def get(self, request, a):
+            await asyncio.sleep(WAIT)
+            return Response()
+
+        @input.query("a", z.to.int())
+        def post(self, request, a):
+            time.sleep(WAIT)
+            return Response()
+
+    MyResource.max_sync_threads = max_sync_threads
+    return MyResource
+
+
+def scope(method):
+    return {
+        "type": "http",
+        "method": method,
+        "path": "/",
+        "query_string": b"a=1",
+        "headers": [],
+    }
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message): ...
+
+
+async def run(resource, sync_ratio: float):
+    scopes = [
+        scope("POST" if i < REQUESTS * sync_ratio else "GET") for i in range(REQUESTS)
+    ]
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def request(s):
+        async with semaphore:
+            await resource(s, receive, send)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request(s) for s in scopes))
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{'sync share':>10}  {'threads':>8}  {'requests/s':>10}")
+    for max_sync_threads in (None, 8):
+        resource = make_resource(max_sync_threads)
+        for sync_ratio in (0, 0.1, 0.5, 1):
+            if max_sync_threads is not None and sync_ratio == 0:
+                continue
+            rps = asyncio.run(run(resource, sync_ratio))
+            threads = "default" if max_sync_threads is None else max_sync_threads
+            print(f"{sync_ratio:>10.0%}  {threads:>8}  {rps:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+"""
+What oasis costs on top of the bare framework.
+
+The same operations are run through the test client of each adapter, once as an
+oasis Resource and once as an equivalent hand-written view of the framework,
+and the latency, the oasis overhead and the peak memory allocated by a request
+are reported.
+
+    python benchmarks/suite.py
+    python benchmarks/suite.py --save main
+    python benchmarks/suite.py --compare main
+
+`--save` stores the results as a baseline in benchmarks/baselines/, `--compare`
+reports the change against a stored baseline and exits with 1 when a case got
+slower than `--threshold`. Latencies only compare on the same machine and
+Python, so baselines are not committed: each one records the environment it was
+measured in, see benchmarks/baselines/README.md.
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+import types
+
+import zangar as z
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+N_PARAMS = 8
+ITEM = z.struct({"id": z.int(), "name": z.str()})
+STATUS = z.struct({"status": z.str()})
+COUNT = z.struct({"count": z.int()})
+ITEMS = [{"id": i, "name": f"item{i}"} for i in range(1000)]
+QUERY = "&".join(f"p{i}={i}" for i in range(N_PARAMS))
+SMALL_BODY = json.dumps(ITEMS[:10]).encode()
+LARGE_BODY = json.dumps(ITEMS).encode()
+
+# name -> (method, path, body, expected status)
+SCENARIOS = {
+    "no_params": ("GET", "/none", None, 200),
+    "query_params": ("GET", f"/query?{QUERY}", None, 200),
+    "json_body_10": ("POST", "/body", SMALL_BODY, 200),
+    "json_body_1000": ("POST", "/body", LARGE_BODY, 200),
+    "list_response": ("GET", "/list", None, 200),
+    "invalid": ("GET", "/query?p0=abc", None, 422),
+}
+
+
+def parse_query(get):
+    """What the hand-written views do in place of the declared query parameters."""
+    params = {}
+    for i in range(N_PARAMS):
+        try:
+            params[f"p{i}"] = int(get(f"p{i}"))
+        except (TypeError, ValueError):
+            return None
+    return params
+
+
+def is_items(data):
+    """What the hand-written views do in place of the declared schemas."""
+    return isinstance(data, list) and all(
+        isinstance(item, dict)
+        and type(item.get("id")) is int
+        and isinstance(item.get("name"), str)
+        for item in data
+    )
+
+
+def with_query_params(input):
+    def decorator(func):
+        for i in reversed(range(N_PARAMS)):
+            func = input.query(f"p{i}", z.to.int())(func)
+        return func
+
+    return decorator
+
+
+def django_clients():
+    from django import setup
+    from django.conf import settings
+    from django.http import JsonResponse
+    from django.test import Client
+    from django.urls import path
+    from django_oasis import MediaType, Resource, input, output, responseify
+
+    class NoParams(Resource):
+        @output.response(200, content={"application/json": MediaType(STATUS)})
+        def get(self, request):
+            return responseify({"status": "ok"})
+
+    class Query(Resource):
+        @with_query_params(input)
+        @output.response(200, content={"application/json": MediaType(COUNT)})
+        def get(self, request, **params):
+            return responseify({"count": sum(params.values())})
+
+    class Body(Resource):
+        @input.body("data", content={"application/json": MediaType(z.list(ITEM))})
+        @output.response(200, content={"application/json": MediaType(COUNT)})
+        def post(self, request, data):
+            return responseify({"count": len(data)})
+
+    class List(Resource):
+        @output.response(200, content={"application/json": MediaType(z.list(ITEM))})
+        def get(self, request):
+            return responseify(ITEMS)
+
+    def no_params(request):
+        return JsonResponse({"status": "ok"})
+
+    def query(request):
+        params = parse_query(request.GET.get)
+        if params is None:
+            return JsonResponse({"in": "query"}, status=422)
+        return JsonResponse({"count": sum(params.values())})
+
+    def body(request):
+        if request.content_type != "application/json":
+            return JsonResponse({}, status=415)
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({}, status=400)
+        if not is_items(data):
+            return JsonResponse({"in": "body"}, status=422)
+        return JsonResponse({"count": len(data)})
+
+    def list_(request):
+        if not is_items(ITEMS):
+            return JsonResponse({}, status=500)
+        return JsonResponse(ITEMS, safe=False)
+
+    urls = types.ModuleType("benchmark_urls")
+    urls.urlpatterns = [
+        path(f"{impl}/{route}", view)
+        for impl, views in (
+            ("oasis", [c.as_view() for c in (NoParams, Query, Body, List)]),
+            ("plain", [no_params, query, body, list_]),
+        )
+        for route, view in zip(("none", "query", "body", "list"), views)
+    ]
+    settings.configure(ROOT_URLCONF=urls, ALLOWED_HOSTS=["testserver"])
+    setup()
+
+    client = Client()
+
+    def request(impl, method, path, body):
+        if method == "GET":
+            return client.get(f"/{impl}{path}").status_code
+        return client.post(
+            f"/{impl}{path}", data=body, content_type="application/json"
+        ).status_code
+
+    return request
+
+
+def flask_clients():
+    from flask import Flask, jsonify, request
+    from flask_oasis import MediaType, Resource, input, output, responseify
+
+    class NoParams(Resource):
+        @output.response(200, content={"application/json": MediaType(STATUS)})
+        def get(self):
+            return responseify({"status": "ok"})
+
+    class Query(Resource):
+        @with_query_params(input)
+        @output.response(200, content={"application/json": MediaType(COUNT)})
+        def get(self, **params):
+            return responseify({"count": sum(params.values())})
+
+    class Body(Resource):
+        @input.body("data", content={"application/json": MediaType(z.list(ITEM))})
+        @output.response(200, content={"application/json": MediaType(COUNT)})
+        def post(self, data):
+            return responseify({"count": len(data)})
+
+    class List(Resource):
+        @output.response(200, content={"application/json": MediaType(z.list(ITEM))})
+        def get(self):
+            return responseify(ITEMS)
+
+    def no_params():
+        return jsonify({"status": "ok"})
+
+    def query():
+        params = parse_query(request.args.get)
+        if params is None:
+            return jsonify({"in": "query"}), 422
+        return jsonify({"count": sum(params.values())})
+
+    def body():
+        if request.mimetype != "application/json":
+            return jsonify({}), 415
+        data = request.get_json(silent=True)
+        if not is_items(data):
+            return jsonify({"in": "body"}), 422
+        return jsonify({"count": len(data)})
+
+    def list_():
+        if not is_items(ITEMS):
+            return jsonify({}), 500
+        return jsonify(ITEMS)
+
+    app = Flask(__name__)
+    for route, resource, view in (
+        ("none", NoParams, no_params),
+        ("query", Query, query),
+        ("body", Body, body),
+        ("list", List, list_),
+    ):
+        app.add_url_rule(f"/oasis/{route}", view_func=resource.as_view())
+        app.add_url_rule(
+            f"/plain/{route}",
+            endpoint=f"plain_{route}",
+            view_func=view,
+            methods=["POST" if route == "body" else "GET"],
+        )
+
+    client = app.test_client()
+
+    def request_(impl, method, path, body):
+        if method == "GET":
+            return client.get(f"/{impl}{path}").status_code
+        return client.post(
+            f"/{impl}{path}", data=body, content_type="application/json"
+        ).status_code
+
+    return request_
+
+
+def starlette_clients():
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route, Router
+    from starlette.testclient import TestClient
+    from starlette_oasis import MediaType, Resource, input, output, responseify
+
+    class NoParams(Resource):
+        @output.response(200, content={"application/json": MediaType(STATUS)})
+        async def get(self, request):
+            return responseify({"status": "ok"})
+
+    class Query(Resource):
+        @with_query_params(input)
+        @output.response(200, content={"application/json": MediaType(COUNT)})
+        async def get(self, request, **params):
+            return responseify({"count": sum(params.values())})
+
+    class Body(Resource):
+        @input.body("data", content={"application/json": MediaType(z.list(ITEM))})
+        @output.response(200, content={"application/json": MediaType(COUNT)})
+        async def post(self, request, data):
+            return responseify({"count": len(data)})
+
+    class List(Resource):
+        @output.response(200, content={"application/json": MediaType(z.list(ITEM))})
+        async def get(self, request):
+            return responseify(ITEMS)
+
+    async def no_params(request: Request):
+        return JSONResponse({"status": "ok"})
+
+    async def query(request: Request):
+        params = parse_query(request.query_params.get)
+        if params is None:
+            return JSONResponse({"in": "query"}, status_code=422)
+        return JSONResponse({"count": sum(params.values())})
+
+    async def body(request: Request):
+        if request.headers.get("content-type") != "application/json":
+            return JSONResponse({}, status_code=415)
+        try:
+            data = json.loads(await request.body())
+        except ValueError:
+            return JSONResponse({}, status_code=400)
+        if not is_items(data):
+            return JSONResponse({"in": "body"}, status_code=422)
+        return JSONResponse({"count": len(data)})
+
+    async def list_(request: Request):
+        if not is_items(ITEMS):
+            return JSONResponse({}, status_code=500)
+        return JSONResponse(ITEMS)
+
+    routes = []
+    for route, resource, view in (
+        ("none", NoParams, no_params),
+        ("query", Query, query),
+        ("body", Body, body),
+        ("list", List, list_),
+    ):
+        routes.append(Route(f"/oasis/{route}", resource))
+        routes.append(
+            Route(
+                f"/plain/{route}",
+                view,
+                methods=["POST" if route == "body" else "GET"],
+            )
+        )
+
+    client = TestClient(Router(routes))
+
+    def request(impl, method, path, body):
+        if method == "GET":
+            return client.get(f"/{impl}{path}").status_code
+        return client.post(
+            f"/{impl}{path}", content=body, headers={"content-type": "application/json"}
+        ).status_code
+
+    return request
+
+
+ADAPTERS = {
+    "django": django_clients,
+    "flask": flask_clients,
+    "starlette": starlette_clients,
+}
+
+
+def measure(call, number: int, repeat: int):
+    """Returns the best latency in microseconds and the peak KiB of one call."""
+    call()
+    best = min(timeit.repeat(call, number=number, repeat=repeat))
+    tracemalloc.start()
+    try:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best / number * 1e6, (peak - current) / 1024
+
+
+def run(adapters, scenarios, number: int, repeat: int):
+    results = {}
+    for adapter in adapters:
+        request = ADAPTERS[adapter]()
+        for scenario in scenarios:
+            method, path, body, expected = SCENARIOS[scenario]
+            for impl in ("oasis", "plain"):
+                status = request(impl, method, path, body)
+                if status != expected:
+                    raise AssertionError(
+                        f"{adapter} {impl} {scenario}: {status} != {expected}"
+                    )
+                us, kib = measure(
+                    functools.partial(request, impl, method, path, body),
+                    number,
+                    repeat,
+                )
+                results[f"{adapter}/{scenario}/{impl}"] = {"us": us, "kib": kib}
+    return results
+
+
+def environment() -> dict:
+    """What the latencies of a baseline depend on, saved along with them."""
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.platform(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+    }
+
+
+def report(results, baseline=None, threshold: float = 0.1) -> bool:
+    """Prints the results, returns whether some case regressed over the baseline."""
+    regressed = False
+    header = f"{'case':<32}  {'oasis us':>9}  {'plain us':>9}  {'overhead':>9}  {'oasis KiB':>9}  {'plain KiB':>9}"
+    if baseline is not None:
+        header += f"  {'vs base':>8}"
+    print(header)
+    for key in results:
+        adapter, scenario, impl = key.split("/")
+        if impl != "oasis":
+            continue
+        oasis = results[key]
+        plain = results[f"{adapter}/{scenario}/plain"]
+        line = (
+            f"{adapter + '/' + scenario:<32}  {oasis['us']:>9.1f}  {plain['us']:>9.1f}"
+            f"  {oasis['us'] - plain['us']:>+9.1f}  {oasis['kib']:>9.1f}  {plain['kib']:>9.1f}"
+        )
+        if baseline is not None and key in baseline:
+            change = oasis["us"] / baseline[key]["us"] - 1
+            line += f"  {change:>+8.1%}"
+            if change > threshold:
+                line += "  REGRESSED"
+                regressed = True
+        print(line)
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--adapter", action="append", choices=list(ADAPTERS))
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS))
+    parser.add_argument("--number", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--json", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    # Django and Flask can only be configured once per process, so each adapter
+    # runs in its own process when several are asked for.
+    adapters = args.adapter or list(ADAPTERS)
+    if len(adapters) > 1:
+        import subprocess
+
+        results = {}
+        for adapter in adapters:
+            output = subprocess.run(
+                [sys.executable, __file__, "--adapter", adapter, "--json"]
+                + [arg for s in args.scenario or () for arg in ("--scenario", s)]
+                + ["--number", str(args.number), "--repeat", str(args.repeat)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.update(json.loads(output))
+    else:
+        results = run(
+            adapters, args.scenario or list(SCENARIOS), args.number, args.repeat
+        )
+
+    if args.json:
+        json.dump(results, sys.stdout)
+        return 0
+
+    baseline = None
+    if args.compare:
+        with open(os.path.join(BASELINES, f"{args.compare}.json")) as f:
+            saved = json.load(f)
+        baseline = saved["results"]
+        if saved["environment"] != environment():
+            print(
+                f"warning: {args.compare} was measured on another environment: "
+                f"{saved['environment']}",
+                file=sys.stderr,
+            )
+    regressed = report(results, baseline, args.threshold)
+    if args.save:
+        os.makedirs(BASELINES, exist_ok=True)
+        with open(os.path.join(BASELINES, f"{args.save}.json"), "w") as f:
+            json.dump(
+                {"environment": environment(), "results": results},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,7 +9,7 @@ from urllib.parse import quote
 
 import docutils
 import docutils.nodes
-from oasis_shared import PathTemplateBase, ResourceBase
+from oasis_shared import PathTemplateBase, ResourceBase, openapi_document
 from sphinx.application import Sphinx
 from sphinx.util.docutils import SphinxDirective
 
@@ -53,17 +53,8 @@ class SwaggerUI(SphinxDirective):
         return [docutils.nodes.raw(text=iframe, format="html")]
 
 
-def _openapi_template(paths: dict[PathTemplateBase, ResourceBase]):
-    openapi = "3.0.3"
-
-    oas = {
-        "openapi": openapi,
-        "info": {"title": "API Document", "version": "0.1.0"},
-        "paths": {
-            path.openapi_path: resource.spec(openapi)
-            for path, resource in paths.items()
-        },
-    }
+def _openapi_template(paths: dict[PathTemplateBase, type[ResourceBase]]):
+    oas = openapi_document(paths, openapi="3.0.3")
     validate_openapi30(oas)
     return oas
 
@@ -1,5 +1,19 @@
-from oasis_shared import MediaType, responseify
+from oasis_shared import (
+    MediaType,
+    RequestContext,
+    current_context,
+    responseify,
+    responseify_stream,
+)
 
 from ._django import PathTemplate, Resource
 
-__all__ = ["Resource", "MediaType", "responseify", "PathTemplate"]
+__all__ = [
+    "Resource",
+    "MediaType",
+    "responseify",
+    "responseify_stream",
+    "PathTemplate",
+    "RequestContext",
+    "current_context",
+]
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
+import functools
+import inspect
+import io
 import json
-
-import zangar as z
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from inspect import iscoroutinefunction
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.http.response import HttpResponseBase
 from oasis_shared import (
     HTTP_METHODS,
+    STREAM_CHUNK_SIZE,
     CookieBase,
     HeaderBase,
     ParameterDecoratorBase,
@@ -16,31 +26,38 @@ from oasis_shared import (
     RequestBodyDecoratorBase,
     ResourceBase,
     catch_throw,
+    current_json_codec,
+    encode_stream,
     resource_ctx,
 )
 
 
-def _process_schema_parsing_exception(e: z.ValidationError, location: str):
-    content = {
-        "in": location,
-        "errors": e.format_errors(),
-    }
-    return JsonResponse(content, status=422)
+def _json_response(data, status: int):
+    codec = current_json_codec()
+    if codec is None:
+        return JsonResponse(data, status=status)
+    return HttpResponse(
+        codec.dumps(data), status=status, content_type="application/json"
+    )
 
 
 class ParameterDecorator(ParameterDecoratorBase):
-    def process_schema_parsing_exception(self, e: z.ValidationError):
-        return _process_schema_parsing_exception(e, self.param.location)
+    def validation_error_response(self, content: dict):
+        return _json_response(content, 422)
+
+    def request_header_fields_too_large(self):
+        return HttpResponse(status=431)
 
 
 def _json_response_processor(kwargs):
-    return JsonResponse(kwargs["data"], status=kwargs["status"])
+    return _json_response(kwargs["data"], kwargs["status"])
 
 
 def _json_request_processor(request: HttpRequest):
+    codec = current_json_codec()
     try:
-        return json.loads(request.body)
-    except json.JSONDecodeError:
+        return (json.loads if codec is None else codec.loads)(request.body)
+    except ValueError:
         return HttpResponse("Invalid JSON", status=400, content_type="text/plain")
 
 
@@ -54,6 +71,17 @@ def _text_response_processor(kwargs):
     )
 
 
+def _stream_response_processor(media_type: str):
+    def processor(kwargs):
+        return StreamingHttpResponse(
+            encode_stream(kwargs["data"], media_type),
+            status=kwargs["status"],
+            content_type=media_type,
+        )
+
+    return processor
+
+
 class Resource(ResourceBase):
     request_content_processors = {
         "application/json": _json_request_processor,
@@ -62,6 +90,9 @@ class Resource(ResourceBase):
     response_content_processors = {
         "application/json": _json_response_processor,
         "text/plain": _text_response_processor,
+        "application/x-ndjson": _stream_response_processor("application/x-ndjson"),
+        "application/json-seq": _stream_response_processor("application/json-seq"),
+        "text/event-stream": _stream_response_processor("text/event-stream"),
     }
 
     def dispatch(self, request, *args, **kwargs):
@@ -70,13 +101,53 @@ class Resource(ResourceBase):
             return getattr(self, method)(request, *args, **kwargs)
         return HttpResponse(status=405)
 
+    async def adispatch(self, request, *args, **kwargs):
+        if type(self).dispatch is not Resource.dispatch:
+            # an overridden, possibly decorated, `dispatch` runs on the loop and
+            # its result is awaited when it calls a coroutine method
+            response = self.dispatch(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+            return response
+        method = request.method.lower()
+        if method in HTTP_METHODS and hasattr(self, method):
+            handle = getattr(self, method)
+            if iscoroutinefunction(handle):
+                return await handle(request, *args, **kwargs)
+            return await sync_to_async(handle)(request, *args, **kwargs)
+        return HttpResponse(status=405)
+
+    @classmethod
+    def query_argumentset(cls, request: HttpRequest, *args, **kwargs):
+        return request.GET
+
+    @classmethod
+    def validation_error_response(cls, content: dict):
+        return _json_response(content, 422)
+
     @classmethod
     def as_view(cls):
+        """
+        An async view when any of the methods is a coroutine function, which
+        then runs under ASGI without a thread hop, sync methods are run with
+        `sync_to_async`.
+        """
+        if any(
+            iscoroutinefunction(getattr(cls, method, None)) for method in HTTP_METHODS
+        ):
+
+            @catch_throw
+            async def aview(request, *args, **kwargs):
+                with resource_ctx(cls, request):
+                    return await cls().adispatch(request, *args, **kwargs)
+
+            return markcoroutinefunction(aview)
+
         @catch_throw
-        def view(*args, **kwargs):
+        def view(request, *args, **kwargs):
             # 每个请求都会创建一个新的 Resoruce 实例，这意味即使将数据写入 self 也是安全的。
-            with resource_ctx(cls):
-                return cls().dispatch(*args, **kwargs)
+            with resource_ctx(cls, request):
+                return cls().dispatch(request, *args, **kwargs)
 
         return view
 
@@ -128,15 +199,35 @@ class RequestBodyDecorator(RequestBodyDecoratorBase):
     def get_processor_args(self, request, *args, **kwargs) -> tuple:
         return (request,)
 
+    def request_stream(self, request: HttpRequest, *args, **kwargs):
+        return iter(functools.partial(request.read, STREAM_CHUNK_SIZE), b"")
+
+    def invalid_body(self, message: str):
+        return HttpResponse(message, status=400, content_type="text/plain")
+
     def is_response(self, response):
         return isinstance(response, HttpResponseBase)
 
-    def process_schema_parsing_exception(self, e: z.ValidationError):
-        return _process_schema_parsing_exception(e, "body")
+    def validation_error_response(self, content: dict):
+        return _json_response(content, 422)
 
     def unsupported_media_type(self):
         return HttpResponse(status=415)
 
+    def content_length(self, request: HttpRequest, *args, **kwargs):
+        try:
+            return int(request.META["CONTENT_LENGTH"])
+        except (KeyError, ValueError):
+            return None
+
+    def buffer_body(self, body: bytes, request: HttpRequest, *args, **kwargs):
+        # as `HttpRequest.body` leaves it
+        request._body = body
+        request._stream = io.BytesIO(body)
+
+    def payload_too_large(self):
+        return HttpResponse(status=413)
+
 
 def body(*args, **kwargs):
     return RequestBodyDecorator(*args, **kwargs)
@@ -1,7 +1,13 @@
+from __future__ import annotations
+
 import hashlib
+from collections.abc import Mapping
 
 from django.http import HttpRequest, HttpResponse, HttpResponseNotModified
 from django.template.loader import render_to_string
+from oasis_shared import OpenAPIDocumentEndpoint
+
+from ._django import PathTemplate, Resource
 
 
 def swagger_ui(config: dict):
@@ -18,3 +24,23 @@ def swagger_ui(config: dict):
         return HttpResponse(content, headers={"ETag": etag})
 
     return view
+
+
+def openapi_json(
+    paths: Mapping[PathTemplate, type[Resource]],
+    *,
+    openapi: str = "3.0.3",
+    info: dict | None = None,
+):
+    endpoint = OpenAPIDocumentEndpoint(paths, openapi=openapi, info=info)
+
+    def view(request: HttpRequest):
+        status, content, headers = endpoint.respond(
+            request.headers.get("If-None-Match"),
+            request.headers.get("Accept-Encoding"),
+        )
+        if status == 304:
+            return HttpResponseNotModified(headers=headers)
+        return HttpResponse(content, status=status, headers=headers)
+
+    return view
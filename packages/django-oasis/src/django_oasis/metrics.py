@@ -0,0 +1,13 @@
+from django.http import HttpRequest, HttpResponse
+from oasis_shared import PROMETHEUS_CONTENT_TYPE, Metrics, MetricsSnapshot
+
+__all__ = ["Metrics", "MetricsSnapshot", "prometheus"]
+
+
+def prometheus(metrics: Metrics):
+    """A view exposing `metrics` to Prometheus."""
+
+    def view(request: HttpRequest):
+        return HttpResponse(metrics.prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    return view
@@ -0,0 +1,16 @@
+from django.http import HttpResponse
+from oasis_shared import (
+    STAGES,
+    ServerTimingBase,
+    StageCollector,
+    StageEvent,
+    StageObserver,
+)
+
+__all__ = ["STAGES", "ServerTiming", "StageCollector", "StageEvent", "StageObserver"]
+
+
+class ServerTiming(ServerTimingBase):
+    def set_header(self, response: HttpResponse, name: str, value: str):
+        response.headers[name] = value
+        return response
@@ -1,8 +1,11 @@
+import copy
+import gzip
 import json
 
 import pytest
 import zangar as z
 from bs4 import BeautifulSoup
+from django.http import HttpResponse
 from django.test import RequestFactory
 from django_oasis import (
     MediaType,
@@ -122,3 +125,559 @@ def test_swagger_ui():
 
     response = view(RequestFactory().get("/", headers={"if-none-match": etag}))
     assert response.status_code == 304
+
+
+def test_stacked_decorators_share_one_invoker():
+    def get(self, request, a, b):
+        return responseify(f"{a}-{b}")
+
+    handler = input.query("a", z.str())(
+        input.query("b", z.str())(
+            output.response(200, content={"text/plain": MediaType()})(get)
+        )
+    )
+    assert handler.__wrapped__ is get
+
+    view = type("MyResource", (Resource,), {"get": handler}).as_view()
+    response = view(RequestFactory().get("/?a=1&b=2"))
+    assert response.status_code == 200
+    assert response.content == b"1-2"
+
+    response = view(RequestFactory().get("/?a=1"))
+    assert response.status_code == 422
+    assert json.loads(response.content)["in"] == "query"
+
+
+def test_register_content_processor():
+    class BaseResource(Resource):
+        pass
+
+    class MyResource(BaseResource):
+        @input.body("body", content={"text/csv": MediaType(z.list(z.str()))})
+        @output.response(200, content={"text/csv": MediaType(z.list(z.str()))})
+        def post(self, request, body):
+            return responseify(body)
+
+    def csv_request_processor(request):
+        return request.body.decode().split(",")
+
+    def csv_response_processor(kwargs):
+        return HttpResponse(
+            ",".join(kwargs["data"]), status=kwargs["status"], content_type="text/csv"
+        )
+
+    BaseResource.register_request_content_processor("text/csv", csv_request_processor)
+    BaseResource.register_response_content_processor("text/csv", csv_response_processor)
+    assert "text/csv" not in Resource._request_processors
+    assert "application/json" in MyResource._request_processors
+
+    view = MyResource.as_view()
+    response = view(RequestFactory().post("/", data="a,b", content_type="text/csv"))
+    assert response.status_code == 200
+    assert response.content == b"a,b"
+
+
+def test_spec_is_cached_and_copied():
+    class MyResource(Resource):
+        @input.query("a", z.int())
+        @output.response(200, content={"application/json": MediaType(z.int())})
+        def get(self, request, a): ...
+
+    spec = MyResource.spec("3.0.3")
+    expected = copy.deepcopy(spec)
+    spec["get"]["parameters"][0]["schema"]["type"] = "string"
+    spec["get"]["responses"].clear()
+    assert MyResource.spec("3.0.3") == expected
+
+
+def test_schema_spec_is_shared():
+    schema = z.struct({"id": z.int()})
+    assert (
+        MediaType(schema).spec("3.0.3")["schema"]
+        is MediaType(schema).spec("3.0.3")["schema"]
+    )
+
+
+_USER = z.struct({"id": z.int(), "name": z.str(), "tags": z.list(z.str())})
+
+
+@pytest.mark.parametrize(
+    "schema, compilable, values",
+    [
+        (z.int(), True, [1, 0, -1, True, 1.0, "1", None]),
+        (z.str(), True, ["", "a", 1, None, b"a"]),
+        (z.to.int(), True, [1, "1", "abc", 1.5, None]),
+        (z.list(z.int()), True, [[], [1, 2], [1, "2"], (1, 2), None]),
+        (
+            _USER,
+            True,
+            [
+                {"id": 1, "name": "a", "tags": []},
+                {"id": 1, "name": "a", "tags": ["b", 2]},
+                {"id": "1", "name": "a", "tags": []},
+                {"id": 1, "name": "a"},
+                {"id": 1, "name": "a", "tags": [], "extra": 1},
+                [],
+            ],
+        ),
+        (
+            z.list(_USER),
+            True,
+            [[{"id": 1, "name": "a", "tags": ["b"]}], [{"id": 1}], [1]],
+        ),
+        (
+            z.str(meta={"oas": {"format": "password"}}),
+            False,
+            ["a", 1],
+        ),
+        (z.int().transform(lambda v: v + 1), False, [1, "1"]),
+        (z.list(z.str().ensure(lambda v: v != "x")), False, [["a"], ["x"]]),
+    ],
+)
+def test_compiled_media_type(schema, compilable, values):
+    media_type = MediaType(schema, compiled=True)
+    assert (media_type.compiled_source is not None) is compilable
+    for value in values:
+        try:
+            expected = schema.parse(copy.deepcopy(value))
+        except z.ValidationError as e:
+            with pytest.raises(z.ValidationError) as exc_info:
+                media_type.parse(value)
+            assert exc_info.value.format_errors() == e.format_errors()
+        else:
+            assert media_type.parse(value) == expected
+            assert type(media_type.parse(value)) is type(expected)
+    assert (media_type.compiled_source is not None) is compilable
+
+
+def test_openapi_json():
+    from django_oasis.docs import openapi_json
+
+    class MyResource(Resource):
+        @input.query("a", z.int())
+        def get(self, request, a): ...
+
+    view = openapi_json({PathTemplate("/my"): MyResource})
+
+    response = view(RequestFactory().get("/"))
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/json"
+    document = json.loads(response.content)
+    assert document["openapi"] == "3.0.3"
+    assert document["paths"] == {"/my": MyResource.spec("3.0.3")}
+    etag = response["ETag"]
+
+    response = view(RequestFactory().get("/", headers={"If-None-Match": etag}))
+    assert response.status_code == 304
+
+    response = view(RequestFactory().get("/", headers={"Accept-Encoding": "gzip"}))
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == "gzip"
+    assert response["ETag"] != etag
+    assert json.loads(gzip.decompress(response.content)) == document
+
+    response = view(
+        RequestFactory().get("/", headers={"Accept-Encoding": "gzip;q=0, br"})
+    )
+    assert "Content-Encoding" not in response
+
+
+def test_responseify_stream():
+    from django_oasis import responseify_stream
+
+    class MyResource(Resource):
+        @output.response(
+            200,
+            content={"application/x-ndjson": MediaType(z.struct({"id": z.int()}))},
+        )
+        def get(self, request):
+            return responseify_stream({"id": i} for i in range(3))
+
+    response = MyResource.as_view()(RequestFactory().get("/"))
+    assert response.streaming
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert b"".join(response.streaming_content) == b'{"id":0}\n{"id":1}\n{"id":2}\n'
+
+
+def test_body_stream():
+    class MyResource(Resource):
+        @input.body(
+            "rows",
+            content={
+                "application/json": MediaType(z.struct({"id": z.int()})),
+                "application/x-ndjson": MediaType(z.struct({"id": z.int()})),
+            },
+            stream=True,
+        )
+        @output.response(200, content={"application/json": MediaType()})
+        def post(self, request, rows):
+            return responseify({"ids": [row["id"] for row in rows]})
+
+    view = MyResource.as_view()
+    response = view(
+        RequestFactory().post(
+            "/", data=b'{"id": 1}\n{"id": 2}\n', content_type="application/x-ndjson"
+        )
+    )
+    assert json.loads(response.content) == {"ids": [1, 2]}
+
+    response = view(
+        RequestFactory().post(
+            "/", data=b'[{"id": 1}, {"id": 2}]', content_type="application/json"
+        )
+    )
+    assert json.loads(response.content) == {"ids": [1, 2]}
+
+    response = view(
+        RequestFactory().post(
+            "/", data=b'[{"id": 1}, {"id": "a"}]', content_type="application/json"
+        )
+    )
+    assert response.status_code == 422
+    assert json.loads(response.content) == {
+        "in": "body",
+        "errors": [{"loc": [1, "id"], "msgs": ["Expected int, received str"]}],
+    }
+
+    response = view(
+        RequestFactory().post("/", data=b'[{"id": 1}', content_type="application/json")
+    )
+    assert response.status_code == 400
+
+
+def test_http_422_of_several_locations():
+    class MyResource(Resource):
+        @input.query("a", z.to.int())
+        @input.query("b", z.to.int())
+        @input.header("x-c", z.to.int())
+        def get(self, request, a, b, **kwargs): ...
+
+    view = MyResource.as_view()
+    response = view(RequestFactory().get("/?a=1&b=x", headers={"X-C": "y"}))
+    assert response.status_code == 422
+    assert json.loads(response.content) == {
+        "in": "header",
+        "errors": [{"loc": ["x-c"], "msgs": ["Cannot convert the value 'y' to int"]}],
+        "others": [
+            {
+                "in": "query",
+                "errors": [
+                    {"loc": ["b"], "msgs": ["Cannot convert the value 'x' to int"]}
+                ],
+            },
+        ],
+    }
+
+
+def test_redecorated_parent_method():
+    class Parent(Resource):
+        @input.query("a", z.to.int())
+        def get(self, request, a, **kwargs):
+            return HttpResponse(str(a))
+
+    class Child(Parent):
+        get = input.header("x-b", z.to.int())(Parent.get)
+
+    factory = RequestFactory()
+    assert Parent.as_view()(factory.get("/?a=1")).content == b"1"
+    assert Child.as_view()(factory.get("/?a=1")).status_code == 422
+    response = Child.as_view()(factory.get("/?a=1", headers={"X-B": "2"}))
+    assert response.content == b"1"
+
+    assert [p["name"] for p in Parent.spec("3.0.3")["get"]["parameters"]] == ["a"]
+    assert sorted(p["name"] for p in Child.spec("3.0.3")["get"]["parameters"]) == [
+        "a",
+        "x-b",
+    ]
+
+
+def test_metrics():
+    from django_oasis.metrics import Metrics, prometheus
+
+    metrics = Metrics()
+
+    class MyResource(Resource):
+        @input.query("a", z.to.int())
+        @input.header("x-b", z.to.int())
+        def get(self, request, a, **kwargs):
+            return HttpResponse()
+
+        @input.body("body", content={"application/json": MediaType(z.int())})
+        def post(self, request, body):
+            return HttpResponse()
+
+    MyResource.metrics = metrics
+    view = MyResource.as_view()
+    assert view(RequestFactory().get("/?a=1", headers={"X-B": "2"})).status_code == 200
+    assert view(RequestFactory().get("/?a=x", headers={"X-B": "y"})).status_code == 422
+    assert (
+        view(RequestFactory().post("/", "1", content_type="text/plain")).status_code
+        == 415
+    )
+
+    snapshot = metrics.snapshot()
+    assert snapshot.counters == {
+        ("requests", "test_metrics.<locals>.MyResource", "get", ""): 2,
+        ("requests", "test_metrics.<locals>.MyResource", "post", ""): 1,
+        ("validation_failures", "test_metrics.<locals>.MyResource", "get", "query"): 1,
+        ("validation_failures", "test_metrics.<locals>.MyResource", "get", "header"): 1,
+        ("unsupported_media_type", "test_metrics.<locals>.MyResource", "post", ""): 1,
+    }
+    buckets, _, count = snapshot.histograms[("test_metrics.<locals>.MyResource", "get")]
+    assert count == 2 and buckets[-1] == (float("inf"), 2)
+
+    text = prometheus(metrics)(RequestFactory().get("/metrics")).content.decode()
+    assert (
+        'oasis_validation_failures_total{resource="test_metrics.<locals>.MyResource",'
+        'method="get",location="query"} 1'
+    ) in text
+    assert "# TYPE oasis_request_duration_seconds histogram" in text
+
+
+def test_metrics_of_decorated_dispatch():
+    from django_oasis.metrics import Metrics
+
+    metrics = Metrics()
+
+    class MyResource(Resource):
+        @input.query("v", z.to.int())
+        def dispatch(self, request, v):
+            return super().dispatch(request)
+
+        @input.query("a", z.to.int())
+        def get(self, request, a):
+            return HttpResponse()
+
+    MyResource.metrics = metrics
+    view = MyResource.as_view()
+    assert view(RequestFactory().get("/?v=1&a=1")).status_code == 200
+    assert view(RequestFactory().get("/?v=x&a=1")).status_code == 422
+    assert view(RequestFactory().get("/?v=1&a=x")).status_code == 422
+
+    snapshot = metrics.snapshot()
+    name = "test_metrics_of_decorated_dispatch.<locals>.MyResource"
+    assert snapshot.counters == {
+        ("requests", name, "get", ""): 3,
+        ("validation_failures", name, "get", "query"): 2,
+    }
+    assert list(snapshot.histograms) == [(name, "get")]
+    assert snapshot.histograms[(name, "get")][2] == 3
+
+
+def test_metrics_of_raising_handlers():
+    from django_oasis.metrics import Metrics
+    from oasis_shared import throw
+
+    metrics = Metrics()
+
+    class MyResource(Resource):
+        @input.query("a", z.to.int())
+        def get(self, request, a):
+            if a:
+                throw(HttpResponse(status=409))
+            raise ValueError(a)
+
+        @input.body(
+            "rows",
+            content={"application/x-ndjson": MediaType(z.struct({"id": z.int()}))},
+            stream=True,
+        )
+        def post(self, request, rows):
+            return HttpResponse(str(sum(row["id"] for row in rows)))
+
+    MyResource.metrics = metrics
+    view = MyResource.as_view()
+    assert view(RequestFactory().get("/?a=1")).status_code == 409
+    with pytest.raises(ValueError):
+        view(RequestFactory().get("/?a=0"))
+    response = view(
+        RequestFactory().post(
+            "/", data=b'{"id": 1}\n{"id": null}\n', content_type="application/x-ndjson"
+        )
+    )
+    assert response.status_code == 422
+
+    snapshot = metrics.snapshot()
+    name = "test_metrics_of_raising_handlers.<locals>.MyResource"
+    assert snapshot.counters == {
+        ("requests", name, "get", ""): 2,
+        ("requests", name, "post", ""): 1,
+        ("validation_failures", name, "post", "body"): 1,
+    }
+    assert snapshot.histograms[(name, "get")][2] == 2
+
+
+def test_metrics_of_ended_threads():
+    import gc
+    import threading
+
+    from django_oasis.metrics import Metrics
+
+    metrics = Metrics()
+
+    class MyResource(Resource):
+        @input.query("a", z.to.int())
+        def get(self, request, a):
+            return HttpResponse()
+
+    MyResource.metrics = metrics
+    view = MyResource.as_view()
+    threads = [
+        threading.Thread(target=view, args=(RequestFactory().get("/?a=1"),))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    gc.collect()
+
+    assert len(metrics._shards) == 0
+    name = "test_metrics_of_ended_threads.<locals>.MyResource"
+    assert metrics.snapshot().counters == {("requests", name, "get", ""): 10}
+
+
+def test_request_limits():
+    class MyResource(Resource):
+        max_query_keys = 3
+
+        @input.query("ids", z.str(), required=False, max_items=2)
+        @input.query("q", z.str(), required=False, max_length=5)
+        @input.header("x-token", z.str(), required=False, max_length=8)
+        def get(self, request, **kwargs):
+            return HttpResponse()
+
+        @input.body(
+            "body", content={"application/json": MediaType(z.int())}, max_bytes=4
+        )
+        def post(self, request, body):
+            return HttpResponse()
+
+    view = MyResource.as_view()
+    factory = RequestFactory()
+    assert view(factory.get("/?q=abc&ids=1&ids=2")).status_code == 200
+
+    response = view(factory.get("/?q=abcdef"))
+    assert response.status_code == 422
+    assert json.loads(response.content) == {
+        "in": "query",
+        "errors": [{"loc": ["q"], "msgs": ["Longer than 5 characters"]}],
+    }
+    assert view(factory.get("/?ids=1&ids=2&ids=3")).status_code == 422
+    assert view(factory.get("/?q=abc&q=abcdef")).status_code == 422
+    assert view(factory.get("/?a=1&b=2&c=3&d=4")).status_code == 422
+    assert view(factory.get("/", headers={"X-Token": "x" * 9})).status_code == 431
+
+    assert (
+        view(factory.post("/", "1", content_type="application/json")).status_code == 200
+    )
+    response = view(factory.post("/", "12345", content_type="application/json"))
+    assert response.status_code == 413
+    response = view(
+        factory.post("/?a=1&b=2&c=3&d=4", "1", content_type="application/json")
+    )
+    assert response.status_code == 422
+    assert json.loads(response.content) == {
+        "in": "query",
+        "errors": [{"loc": [], "msgs": ["More than 3 keys"]}],
+    }
+
+
+def test_async_view():
+    import asyncio
+
+    from asgiref.sync import iscoroutinefunction
+    from django.test import AsyncRequestFactory
+
+    class MyResource(Resource):
+        @input.query("a", z.to.int())
+        @input.body("body", content={"application/json": MediaType(z.list(z.int()))})
+        async def post(self, request, a, body):
+            return HttpResponse(json.dumps([a, body]))
+
+        def put(self, request):
+            return HttpResponse("sync")
+
+    view = MyResource.as_view()
+    assert iscoroutinefunction(view)
+    assert not iscoroutinefunction(Resource.as_view())
+
+    factory = AsyncRequestFactory()
+
+    def post(path, data):
+        request = factory.post(path, data, content_type="application/json")
+        return asyncio.run(view(request))
+
+    assert json.loads(post("/?a=1", "[1, 2]").content) == [1, [1, 2]]
+    assert post("/?a=x", "[1]").status_code == 422
+    assert post("/?a=1", '["x"]').status_code == 422
+    assert post("/?a=1", "[").status_code == 400
+    assert asyncio.run(view(factory.put("/"))).content == b"sync"
+    assert asyncio.run(view(factory.get("/"))).status_code == 405
+
+
+def test_async_view_with_decorated_dispatch():
+    import asyncio
+
+    from django.test import AsyncRequestFactory
+
+    class MyResource(Resource):
+        @input.query("uid", z.to.int())
+        @output.response(404, content={"application/json": MediaType()})
+        def dispatch(self, request, uid):
+            if uid == 2:
+                return responseify({"error": "no user"}, status=404)
+            self.user = uid
+            return super().dispatch(request)
+
+        async def get(self, request):
+            if self.user != 1:
+                return responseify({"error": "no user"}, status=404)
+            return HttpResponse(str(self.user))
+
+    view = MyResource.as_view()
+    factory = AsyncRequestFactory()
+    assert asyncio.run(view(factory.get("/?uid=1"))).content == b"1"
+    assert asyncio.run(view(factory.get("/?uid=2"))).status_code == 404
+    response = asyncio.run(view(factory.get("/?uid=3")))
+    assert response.status_code == 404
+    assert json.loads(response.content) == {"error": "no user"}
+    assert asyncio.run(view(factory.get("/?uid=x"))).status_code == 422
+    assert "404" in MyResource.spec("3.0.3")["get"]["responses"]
+
+
+def test_async_view_observed_through_decorated_dispatch():
+    import asyncio
+
+    from django.test import AsyncRequestFactory
+    from django_oasis.metrics import Metrics
+    from django_oasis.timing import ServerTiming
+
+    metrics = Metrics()
+
+    class MyResource(Resource):
+        stage_observer = ServerTiming()
+
+        @input.query("v", z.to.int())
+        def dispatch(self, request, v):
+            return super().dispatch(request)
+
+        @input.query("a", z.to.int())
+        async def get(self, request, a):
+            await asyncio.sleep(0)
+            return HttpResponse(str(a))
+
+    MyResource.metrics = metrics
+    view = MyResource.as_view()
+    factory = AsyncRequestFactory()
+    response = asyncio.run(view(factory.get("/?v=1&a=2")))
+    assert response.content == b"2"
+    assert response["Server-Timing"].startswith("parameters;")
+    assert "handler;dur=" in response["Server-Timing"]
+    assert asyncio.run(view(factory.get("/?v=1&a=x"))).status_code == 422
+
+    name = "test_async_view_observed_through_decorated_dispatch.<locals>.MyResource"
+    assert metrics.snapshot().counters == {
+        ("requests", name, "get", ""): 2,
+        ("validation_failures", name, "get", "query"): 1,
+    }
@@ -1,5 +1,19 @@
-from oasis_shared import MediaType, responseify
+from oasis_shared import (
+    MediaType,
+    RequestContext,
+    current_context,
+    responseify,
+    responseify_stream,
+)
 
 from ._flask import PathTemplate, Resource
 
-__all__ = ["MediaType", "Resource", "responseify", "PathTemplate"]
+__all__ = [
+    "MediaType",
+    "Resource",
+    "responseify",
+    "responseify_stream",
+    "PathTemplate",
+    "RequestContext",
+    "current_context",
+]
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
-from flask import current_app, jsonify, make_response, request
+import asyncio
+import functools
+import inspect
+import os
+import threading
+from collections.abc import AsyncIterable, Coroutine
+
+from flask import current_app, jsonify, make_response, request, stream_with_context
 from oasis_shared import (
     HTTP_METHODS,
+    STREAM_CHUNK_SIZE,
     CookieBase,
     HeaderBase,
     ParameterDecoratorBase,
@@ -12,10 +20,11 @@ from oasis_shared import (
     RequestBodyDecoratorBase,
     ResourceBase,
     catch_throw,
+    current_json_codec,
+    encode_stream,
     resource_ctx,
 )
 from werkzeug.datastructures import Headers
-from zangar.exceptions import ValidationError
 
 
 class Query(QueryBase):
@@ -30,6 +39,12 @@ class _HeadersMapping(dict):
     def __getitem__(self, key):
         return self.headers.get(key)
 
+    def get(self, key, default=None):
+        return self.headers.get(key, default)
+
+    def getlist(self, key):
+        return self.headers.getlist(key)
+
 
 class Header(HeaderBase):
     def get_argumentset(self, *args, **kwargs):
@@ -51,8 +66,11 @@ class Path(PathBase):
 
 
 class ParameterDecorator(ParameterDecoratorBase):
-    def process_schema_parsing_exception(self, e: ValidationError):
-        return _process_schema_parsing_exception(e, self.param.location)
+    def validation_error_response(self, content: dict):
+        return _json_response(content, 422)
+
+    def request_header_fields_too_large(self):
+        return current_app.response_class(status=431)
 
 
 def query(*args, **kwargs):
@@ -71,12 +89,29 @@ def header(*args, **kwargs):
     return ParameterDecorator(Header(*args, **kwargs))
 
 
+def _json_response(data, status: int):
+    codec = current_json_codec()
+    if codec is None:
+        return make_response(jsonify(data), status)
+    return current_app.response_class(
+        codec.dumps(data), status=status, mimetype="application/json"
+    )
+
+
 def _json_response_processor(kwargs):
-    return make_response(jsonify(kwargs["data"]), kwargs["status"])
+    return _json_response(kwargs["data"], kwargs["status"])
 
 
 def _json_request_processor():
-    return request.json
+    codec = current_json_codec()
+    if codec is None:
+        return request.json
+    try:
+        return codec.loads(request.get_data())
+    except ValueError:
+        return current_app.response_class(
+            "Invalid JSON", status=400, mimetype="text/plain"
+        )
 
 
 def _form_request_processor():
@@ -89,6 +124,92 @@ def _text_response_processor(kwargs):
     return response
 
 
+async def _await(awaitable):
+    return await awaitable
+
+
+def _iterate_in_loop(
+    aiterable: AsyncIterable, loop: asyncio.AbstractEventLoop | None = None
+):
+    """
+    WSGI can only send sync iterables, drive an async one in `loop`, running in
+    another thread, or else in a loop of its own. It is closed there when the
+    response is left unfinished.
+    """
+    if loop is None:
+        own_loop = asyncio.new_event_loop()
+        run = own_loop.run_until_complete
+    else:
+        own_loop = None
+
+        def run(awaitable):
+            return asyncio.run_coroutine_threadsafe(_await(awaitable), loop).result()
+
+    iterator = aiterable.__aiter__()
+    exhausted = False
+    try:
+        while True:
+            try:
+                value = run(iterator.__anext__())
+            except StopAsyncIteration:
+                exhausted = True
+                return
+            yield value
+    finally:
+        try:
+            if not exhausted and hasattr(iterator, "aclose"):
+                run(iterator.aclose())
+        finally:
+            if own_loop is not None:
+                own_loop.close()
+
+
+def _stream_response_processor(media_type: str):
+    def processor(kwargs):
+        data = kwargs["data"]
+        if isinstance(data, AsyncIterable):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            # made by a handler run in the background loop, the iterable may
+            # hold resources of that loop
+            data = _iterate_in_loop(data, loop if loop is _background_loop else None)
+        return current_app.response_class(
+            stream_with_context(encode_stream(data, media_type)),
+            status=kwargs["status"],
+            mimetype=media_type,
+        )
+
+    return processor
+
+
+_background_loop: asyncio.AbstractEventLoop | None = None
+_background_loop_pid: int | None = None
+_background_loop_lock = threading.Lock()
+
+
+def _get_background_loop():
+    """The event loop of this process, running in a daemon thread."""
+    global _background_loop, _background_loop_pid
+    pid = os.getpid()
+    if _background_loop_pid != pid:  # not started yet, or in a forked worker
+        with _background_loop_lock:
+            if _background_loop_pid != pid:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="oasis-event-loop", daemon=True
+                ).start()
+                _background_loop, _background_loop_pid = loop, pid
+    return _background_loop
+
+
+def _run_in_background_loop(coro: Coroutine):
+    # The task runs in a copy of the current context, so that `request` and
+    # the other context locals of Flask are those of this request.
+    return asyncio.run_coroutine_threadsafe(coro, _get_background_loop()).result()
+
+
 class Resource(ResourceBase):
     request_content_processors = {
         "application/json": _json_request_processor,
@@ -97,17 +218,63 @@ class Resource(ResourceBase):
     response_content_processors = {
         "application/json": _json_response_processor,
         "text/plain": _text_response_processor,
+        "application/x-ndjson": _stream_response_processor("application/x-ndjson"),
+        "application/json-seq": _stream_response_processor("application/json-seq"),
+        "text/event-stream": _stream_response_processor("text/event-stream"),
     }
 
     def dispatch(self, *args, **kwargs):
         return getattr(self, request.method.lower())(*args, **kwargs)
 
+    async def adispatch(self, *args, **kwargs):
+        response = self.dispatch(*args, **kwargs)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
     @classmethod
-    def as_view(cls):
-        @catch_throw
-        def view(*args, **kwargs):
-            with resource_ctx(cls):
-                return cls().dispatch(*args, **kwargs)
+    def query_argumentset(cls, *args, **kwargs):
+        return request.args
+
+    @classmethod
+    def validation_error_response(cls, content: dict):
+        return _json_response(content, 422)
+
+    @classmethod
+    def as_view(cls, *, background_loop: bool = False):
+        """
+        :param background_loop: Run coroutine handlers in an event loop kept
+            running by each worker process, instead of the loop Flask creates
+            for every request to an async view, so that async clients and their
+            connection pools can be reused across requests.
+        """
+        if background_loop:
+
+            @catch_throw
+            def view(*args, **kwargs):
+                with resource_ctx(cls, request._get_current_object()):
+                    response = cls().dispatch(*args, **kwargs)
+                    if inspect.iscoroutine(response):
+                        response = _run_in_background_loop(response)
+                    return response
+
+        elif any(
+            inspect.iscoroutinefunction(getattr(cls, method, None))
+            for method in HTTP_METHODS
+        ):
+            # run by Flask with `ensure_sync`
+
+            @catch_throw
+            async def view(*args, **kwargs):
+                with resource_ctx(cls, request._get_current_object()):
+                    return await cls().adispatch(*args, **kwargs)
+
+        else:
+
+            @catch_throw
+            def view(*args, **kwargs):
+                with resource_ctx(cls, request._get_current_object()):
+                    return cls().dispatch(*args, **kwargs)
 
         view.methods = [
             method.upper() for method in HTTP_METHODS if hasattr(cls, method)
@@ -124,15 +291,27 @@ class RequestBodyDecorator(RequestBodyDecoratorBase):
     def is_response(self, response):
         return isinstance(response, current_app.response_class)
 
+    def request_stream(self, *args, **kwargs):
+        return iter(functools.partial(request.stream.read, STREAM_CHUNK_SIZE), b"")
+
+    def invalid_body(self, message: str):
+        return current_app.response_class(message, status=400, mimetype="text/plain")
+
     def unsupported_media_type(self):
         return current_app.response_class(status=415)
 
-    def process_schema_parsing_exception(self, e: ValidationError):
-        return _process_schema_parsing_exception(e, "body")
+    def content_length(self, *args, **kwargs):
+        return request.content_length
+
+    def buffer_body(self, body: bytes, *args, **kwargs):
+        # read by `get_data` and the form parser as the cached data
+        request._cached_data = body
 
+    def payload_too_large(self):
+        return current_app.response_class(status=413)
 
-def _process_schema_parsing_exception(e: ValidationError, location: str):
-    return make_response(jsonify({"in": location, "errors": e.format_errors()}), 422)
+    def validation_error_response(self, content: dict):
+        return _json_response(content, 422)
 
 
 def body(*args, **kwargs):
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+from flask import current_app, request
+from oasis_shared import OpenAPIDocumentEndpoint
+
+from ._flask import PathTemplate, Resource
+
+
+def openapi_json(
+    paths: Mapping[PathTemplate, type[Resource]],
+    *,
+    openapi: str = "3.0.3",
+    info: dict | None = None,
+):
+    endpoint = OpenAPIDocumentEndpoint(paths, openapi=openapi, info=info)
+
+    def view():
+        status, content, headers = endpoint.respond(
+            request.headers.get("If-None-Match"),
+            request.headers.get("Accept-Encoding"),
+        )
+        return current_app.response_class(content, status=status, headers=headers)
+
+    view.methods = ["GET"]
+    return view
@@ -0,0 +1,16 @@
+from flask import current_app
+from oasis_shared import PROMETHEUS_CONTENT_TYPE, Metrics, MetricsSnapshot
+
+__all__ = ["Metrics", "MetricsSnapshot", "prometheus"]
+
+
+def prometheus(metrics: Metrics):
+    """A view exposing `metrics` to Prometheus."""
+
+    def view():
+        return current_app.response_class(
+            metrics.prometheus(), content_type=PROMETHEUS_CONTENT_TYPE
+        )
+
+    view.methods = ["GET"]
+    return view
@@ -0,0 +1,18 @@
+from flask import make_response
+from oasis_shared import (
+    STAGES,
+    ServerTimingBase,
+    StageCollector,
+    StageEvent,
+    StageObserver,
+)
+
+__all__ = ["STAGES", "ServerTiming", "StageCollector", "StageEvent", "StageObserver"]
+
+
+class ServerTiming(ServerTimingBase):
+    def set_header(self, response, name: str, value: str):
+        # handlers may return anything Flask turns into a response
+        response = make_response(response)
+        response.headers[name] = value
+        return response
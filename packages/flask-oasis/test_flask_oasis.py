@@ -1,7 +1,16 @@
+import time
+
 import pytest
 import zangar as z
-from flask import Flask
-from flask_oasis import MediaType, Resource, input
+from flask import Flask, request
+from flask_oasis import (
+    MediaType,
+    Resource,
+    current_context,
+    input,
+    output,
+    responseify,
+)
 
 
 @pytest.fixture
@@ -71,3 +80,354 @@ def test_http_422(app):
             "in": "query",
             "errors": [{"loc": ["a"], "msgs": ["Expected int, received str"]}],
         }
+
+
+def test_responseify_with_dispatch_responses(app):
+    class MyResource(Resource):
+        @output.response(404, content={"application/json": MediaType()})
+        def dispatch(self, *args, **kwargs):
+            return super().dispatch(*args, **kwargs)
+
+        @output.response(200, content={"application/json": MediaType()})
+        @output.response(200, content={"text/plain": MediaType()})
+        def get(self):
+            if request.args.get("missing"):
+                return responseify({"error": "missing"}, status=404)
+            return responseify("OK", media_type="text/plain")
+
+    view = MyResource.as_view()
+    with app.test_request_context("/"):
+        response = view()
+        assert response.status_code == 200
+        assert response.mimetype == "text/plain"
+
+    with app.test_request_context("/?missing=1"):
+        response = view()
+        assert response.status_code == 404
+        assert response.json == {"error": "missing"}
+
+
+def test_openapi_json(app):
+    from flask_oasis import PathTemplate
+    from flask_oasis.docs import openapi_json
+
+    app.add_url_rule(
+        "/openapi.json", view_func=openapi_json({PathTemplate("/"): Resource})
+    )
+    client = app.test_client()
+
+    response = client.get("/openapi.json")
+    assert response.status_code == 200
+    assert response.json["paths"] == {"/": {}}
+
+    response = client.get(
+        "/openapi.json", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert response.status_code == 304
+
+
+def test_responseify_stream(app):
+    from flask_oasis import responseify_stream
+
+    class MyResource(Resource):
+        @output.response(
+            200, content={"text/event-stream": MediaType(z.struct({"id": z.int()}))}
+        )
+        def get(self):
+            async def events():
+                for i in range(2):
+                    yield {"id": i}
+
+            return responseify_stream(events())
+
+    app.add_url_rule("/events", view_func=MyResource.as_view())
+    response = app.test_client().get("/events")
+    assert response.mimetype == "text/event-stream"
+    assert response.data == b'data: {"id":0}\n\ndata: {"id":1}\n\n'
+
+
+def test_responseify_stream_shadow(app):
+    from flask_oasis import responseify_stream
+
+    errors = []
+
+    class MyResource(Resource):
+        response_validation = "shadow"
+
+        @classmethod
+        def on_response_validation_error(cls, definition, value, error):
+            errors.append(value)
+
+        @output.response(
+            200, content={"application/x-ndjson": MediaType(z.struct({"id": z.int()}))}
+        )
+        def get(self):
+            return responseify_stream({"id": i if i % 100 else "x"} for i in range(250))
+
+    app.add_url_rule("/rows", view_func=MyResource.as_view())
+    response = app.test_client().get("/rows")
+    assert len(response.data.splitlines()) == 250
+    for _ in range(100):
+        if len(errors) == 3:
+            break
+        time.sleep(0.01)
+    assert errors == [{"id": "x"}] * 3
+
+
+def test_json_codec(app):
+    class MyResource(Resource):
+        json_codec = "json"
+
+        @input.body(
+            "body", content={"application/json": MediaType(z.struct({"a": z.int()}))}
+        )
+        @output.response(200, content={"application/json": MediaType()})
+        def post(self, body):
+            return responseify(body)
+
+    app.add_url_rule("/codec", view_func=MyResource.as_view())
+    client = app.test_client()
+
+    response = client.post("/codec", data='{"a": 1}', content_type="application/json")
+    assert response.status_code == 200
+    assert response.data == b'{"a":1}'
+
+    response = client.post("/codec", data="{", content_type="application/json")
+    assert response.status_code == 400
+
+    response = client.post("/codec", data='{"a": "b"}', content_type="application/json")
+    assert response.status_code == 422
+    assert response.data == (
+        b'{"in":"body","errors":[{"loc":["a"],"msgs":["Expected int, received str"]}]}'
+    )
+
+
+def test_response_validation_modes(app):
+    errors = []
+
+    class MyResource(Resource):
+        response_validation = "shadow"
+
+        @classmethod
+        def on_response_validation_error(cls, definition, value, error):
+            errors.append((definition.status, value))
+
+        @output.response(
+            200, content={"application/json": MediaType(z.struct({"a": z.int()}))}
+        )
+        def get(self):
+            return responseify({"a": "x"})
+
+        @output.response(
+            200,
+            content={"application/json": MediaType(z.struct({"a": z.int()}))},
+            validation="off",
+        )
+        def post(self):
+            return responseify({"a": "x"})
+
+    app.add_url_rule("/modes", view_func=MyResource.as_view())
+    client = app.test_client()
+
+    assert client.post("/modes").json == {"a": "x"}
+    assert client.get("/modes").json == {"a": "x"}
+    for _ in range(100):
+        if errors:
+            break
+        time.sleep(0.01)
+    assert errors == [(200, {"a": "x"})]
+
+    with pytest.raises(ValueError):
+        output.response(200, validation="partial")
+
+
+def test_response_validation_modes_apply_transforms(app):
+    from dataclasses import asdict, dataclass
+
+    @dataclass
+    class User:
+        name: str
+
+    class MyResource(Resource):
+        @output.response(
+            200,
+            content={
+                "application/json": MediaType(z.dataclass(User).transform(asdict))
+            },
+            validation="off",
+        )
+        def get(self):
+            return responseify(User(name="a"))
+
+        @output.response(
+            200,
+            content={
+                "application/json": MediaType(z.dataclass(User).transform(asdict))
+            },
+            validation="shadow",
+        )
+        def post(self):
+            return responseify(User(name="a"))
+
+    app.add_url_rule("/transforms", view_func=MyResource.as_view())
+    client = app.test_client()
+    assert client.get("/transforms").json == {"name": "a"}
+    assert client.post("/transforms").json == {"name": "a"}
+    assert not MediaType(z.struct({"a": z.int()})).transforms
+
+
+def test_stage_observer(app):
+    from flask_oasis.timing import StageCollector
+
+    collector = StageCollector()
+
+    class MyResource(Resource):
+        stage_observer = collector
+
+        @input.query("a", z.to.int())
+        @input.body(
+            "body", content={"application/json": MediaType(z.struct({"b": z.int()}))}
+        )
+        @output.response(
+            200, content={"application/json": MediaType(z.struct({"a": z.int()}))}
+        )
+        def post(self, a, body):
+            return responseify({"a": a + body["b"]})
+
+    app.add_url_rule("/stages", view_func=MyResource.as_view())
+    client = app.test_client()
+
+    assert client.post("/stages?a=1", json={"b": 2}).json == {"a": 3}
+    assert [(e.method, e.stage) for e in collector.events] == [
+        ("post", "parameters"),
+        ("post", "body_decoding"),
+        ("post", "body_validation"),
+        ("post", "response_validation"),
+        ("post", "serialization"),
+        ("post", "handler"),
+    ]
+    assert collector.events[0].location == "query"
+    assert collector.events[1].media_type == "application/json"
+    assert collector.summary()[("MyResource", "post", "handler")][0] == 1
+
+    collector.clear()
+    assert client.post("/stages?a=x", json={"b": 2}).status_code == 422
+    assert [e.stage for e in collector.events] == ["parameters"]
+
+
+def test_current_context(app):
+    seen = []
+
+    class MyResource(Resource):
+        @input.query("a", z.to.int())
+        @output.response(200, content={"text/plain": MediaType(z.str())})
+        def get(self, a):
+            ctx = current_context()
+            seen.append((ctx.resource, ctx.request.path, dict(ctx.parameters)))
+            return "OK"
+
+    app.add_url_rule("/context", view_func=MyResource.as_view())
+    assert app.test_client().get("/context?a=1").status_code == 200
+    assert seen == [(MyResource, "/context", {"a": 1})]
+    with pytest.raises(LookupError):
+        current_context()
+
+
+@pytest.mark.parametrize("background_loop", [False, True])
+def test_async_handlers(app, background_loop):
+    import asyncio
+
+    loops = []
+
+    class MyResource(Resource):
+        @input.query("a", z.to.int())
+        @output.response(200, content={"application/json": MediaType(z.list(z.int()))})
+        async def get(self, a):
+            loops.append(asyncio.get_running_loop())
+            await asyncio.sleep(0)
+            return responseify([a, int(request.args["b"])])
+
+    app.add_url_rule(
+        "/async", view_func=MyResource.as_view(background_loop=background_loop)
+    )
+    client = app.test_client()
+    assert client.get("/async?a=1&b=2").json == [1, 2]
+    assert client.get("/async?a=3&b=4").json == [3, 4]
+    assert client.get("/async?a=x&b=4").status_code == 422
+    if background_loop:
+        assert loops[0] is loops[1]
+
+
+@pytest.mark.parametrize("background_loop", [False, True])
+def test_async_handlers_observed_through_decorated_dispatch(app, background_loop):
+    import asyncio
+
+    from flask_oasis.metrics import Metrics
+    from flask_oasis.timing import ServerTiming
+
+    metrics = Metrics()
+
+    class MyResource(Resource):
+        stage_observer = ServerTiming()
+
+        @input.query("v", z.to.int())
+        def dispatch(self, v):
+            return super().dispatch()
+
+        @input.query("a", z.to.int())
+        async def get(self, a):
+            await asyncio.sleep(0)
+            return {"a": a}
+
+    MyResource.metrics = metrics
+    app.add_url_rule(
+        "/observed", view_func=MyResource.as_view(background_loop=background_loop)
+    )
+    client = app.test_client()
+    response = client.get("/observed?v=1&a=2")
+    assert response.json == {"a": 2}
+    assert "handler;dur=" in response.headers["Server-Timing"]
+    assert client.get("/observed?v=1&a=x").status_code == 422
+
+    name = "test_async_handlers_observed_through_decorated_dispatch.<locals>.MyResource"
+    assert metrics.snapshot().counters == {
+        ("requests", name, "get", ""): 2,
+        ("validation_failures", name, "get", "query"): 1,
+    }
+
+
+def test_async_stream_in_background_loop(app):
+    import asyncio
+
+    from flask_oasis import responseify_stream
+
+    loops = []
+    closed = []
+
+    class MyResource(Resource):
+        @output.response(
+            200, content={"application/x-ndjson": MediaType(z.struct({"id": z.int()}))}
+        )
+        async def get(self):
+            loops.append(asyncio.get_running_loop())
+
+            async def rows():
+                try:
+                    for i in range(3):
+                        loops.append(asyncio.get_running_loop())
+                        yield {"id": i}
+                finally:
+                    closed.append(True)
+
+            return responseify_stream(rows())
+
+    app.add_url_rule("/rows", view_func=MyResource.as_view(background_loop=True))
+    client = app.test_client()
+    response = client.get("/rows")
+    assert response.data.splitlines() == [b'{"id":0}', b'{"id":1}', b'{"id":2}']
+    assert len(loops) == 4 and all(loop is loops[0] for loop in loops)
+
+    response = client.get("/rows", buffered=False)
+    next(iter(response.response))
+    response.close()
+    assert closed == [True, True]
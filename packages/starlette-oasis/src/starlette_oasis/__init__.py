@@ -1,5 +1,21 @@
-from oasis_shared import MediaType, responseify
+from oasis_shared import (
+    MediaType,
+    RequestContext,
+    current_context,
+    responseify,
+    responseify_stream,
+)
 
-from ._starlette import PathTemplate, Resource
+from ._starlette import Offload, PathTemplate, Resource, aresponseify
 
-__all__ = ["MediaType", "Resource", "responseify", "PathTemplate"]
+__all__ = [
+    "MediaType",
+    "Resource",
+    "responseify",
+    "responseify_stream",
+    "aresponseify",
+    "Offload",
+    "PathTemplate",
+    "RequestContext",
+    "current_context",
+]
@@ -1,6 +1,13 @@
-from contextvars import ContextVar
-
-import zangar as z
+import asyncio
+import contextvars
+import functools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from inspect import iscoroutinefunction
+
+import anyio.to_thread
+from anyio.lowlevel import RunVar
 from oasis_shared import (
     HTTP_METHODS,
     ParameterDecoratorBase,
@@ -9,30 +16,181 @@ from oasis_shared import (
     QueryBase,
     RequestBodyDecoratorBase,
     ResourceBase,
+    aresponseify_base,
     catch_throw,
+    current_context,
+    current_json_codec,
+    encode_stream,
     resource_ctx,
+    responseify,
 )
 from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
+from starlette.responses import JSONResponse, Response, StreamingResponse
 from starlette.types import Receive, Scope, Send
 
-_request_cv: ContextVar[Request] = ContextVar("request")
+
+class Offload:
+    """
+    Runs the decoding and validation of large request bodies, and the
+    validation and rendering of large responses returned with `aresponseify`,
+    in a thread pool instead of on the event loop. Set it as `offload` of a
+    resource.
+
+    A body is large from `min_bytes`, by its Content-Length, or when it is an
+    array of at least `min_items` items; a response when it is an array or an
+    object of at least `min_items` items.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_bytes: int = 1 << 20,
+        min_items: int = 10_000,
+        max_workers: int | None = None,
+    ):
+        self.min_bytes = min_bytes
+        self.min_items = min_items
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # tasks submitted but not started yet, and running
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+
+    def is_large(self, size: int | None = None, value=None) -> bool:
+        if size is not None and size >= self.min_bytes:
+            return True
+        return isinstance(value, (list, dict)) and len(value) >= self.min_items
+
+    def _call(self, context: contextvars.Context, func, args, kwargs):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return context.run(func, *args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    async def run(self, func, /, *args, **kwargs):
+        """Calls `func` in the pool, within the current context."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="oasis-offload"
+            )
+        with self._lock:
+            self.queued += 1
+        call = functools.partial(
+            self._call, contextvars.copy_context(), func, args, kwargs
+        )
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    def prometheus(self) -> str:
+        """The state of the pool in the Prometheus text exposition format."""
+        lines = []
+        for name, kind, help, value in (
+            ("queued", "gauge", "Offloaded tasks waiting for a worker.", self.queued),
+            ("running", "gauge", "Offloaded tasks running.", self.running),
+            ("completed_total", "counter", "Offloaded tasks done.", self.completed),
+        ):
+            lines.append(f"# HELP oasis_offload_{name} {help}")
+            lines.append(f"# TYPE oasis_offload_{name} {kind}")
+            lines.append(f"oasis_offload_{name} {value}")
+        return "\n".join(lines) + "\n"
 
 
 async def _json_request_processor(request: Request):
-    return await request.json()
+    codec = current_json_codec()
+    loads = json.loads if codec is None else codec.loads
+    body = await request.body()
+    offload: Offload | None = current_context().resource.offload
+    if offload is not None and offload.is_large(len(body)):
+        return await offload.run(loads, body)
+    return loads(body)
+
+
+async def aresponseify(
+    raw,
+    /,
+    *,
+    status: int | None = None,
+    media_type: str | None = None,
+):
+    """
+    `responseify`, in the thread pool of `offload` for large responses, else
+    validating arrays against media types with `chunk_size` by chunks.
+    """
+    offload: Offload | None = current_context().resource.offload
+    if offload is not None and offload.is_large(value=raw):
+        return await offload.run(responseify, raw, status=status, media_type=media_type)
+    return await aresponseify_base(raw, status=status, media_type=media_type)
+
+
+def _json_response(data, status: int):
+    codec = current_json_codec()
+    if codec is None:
+        return JSONResponse(data, status_code=status)
+    return Response(
+        codec.dumps(data), status_code=status, media_type="application/json"
+    )
 
 
 def _json_response_processor(kwargs):
-    return JSONResponse(kwargs["data"], status_code=kwargs["status"])
+    return _json_response(kwargs["data"], kwargs["status"])
+
+
+def _stream_response_processor(media_type: str):
+    def processor(kwargs):
+        return StreamingResponse(
+            encode_stream(kwargs["data"], media_type),
+            status_code=kwargs["status"],
+            media_type=media_type,
+        )
+
+    return processor
+
+
+_sync_limiters: RunVar[dict] = RunVar("oasis_sync_limiters")
+
+
+def _sync_limiter(resource: type["Resource"]):
+    if resource.max_sync_threads is None:
+        return None
+    try:
+        limiters = _sync_limiters.get()
+    except LookupError:
+        limiters = {}
+        _sync_limiters.set(limiters)
+    try:
+        return limiters[resource]
+    except KeyError:
+        limiter = limiters[resource] = anyio.CapacityLimiter(resource.max_sync_threads)
+        return limiter
+
+
+async def _run_sync(func, /, *args, **kwargs):
+    """Runs a sync handler in a worker thread, within the current context."""
+    limiter = _sync_limiter(current_context().resource)
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await anyio.to_thread.run_sync(call, limiter=limiter)
 
 
 class Resource(ResourceBase):
+    offload: Offload | None = None
+    # Sync handlers run in worker threads, at most this many at once for this
+    # resource; None shares the default limiter of anyio.
+    max_sync_threads: int | None = None
+
     request_content_processors = {
         "application/json": _json_request_processor,
     }
     response_content_processors = {
         "application/json": _json_response_processor,
+        "application/x-ndjson": _stream_response_processor("application/x-ndjson"),
+        "application/json-seq": _stream_response_processor("application/json-seq"),
+        "text/event-stream": _stream_response_processor("text/event-stream"),
     }
 
     def __init__(self, scope: Scope, receive: Receive, send: Send):
@@ -44,20 +202,27 @@ class Resource(ResourceBase):
         method = request.method.lower()
         if method in HTTP_METHODS and hasattr(self, method):
             handle = getattr(self, method)
-            response = await handle(request, *args, **kwargs)
+            if iscoroutinefunction(handle):
+                response = await handle(request, *args, **kwargs)
+            else:
+                response = await _run_sync(handle, request, *args, **kwargs)
         else:
             response = Response(status_code=405)
         return response
 
+    @classmethod
+    def query_argumentset(cls, request: Request, *args, **kwargs):
+        return request.query_params
+
+    @classmethod
+    def validation_error_response(cls, content: dict):
+        return _json_response(content, 422)
+
     def __await__(self):
         async def func():
             request = Request(self.__scope, receive=self.__receive)
-            token = _request_cv.set(request)
-            with resource_ctx(self.__class__):
-                try:
-                    response = await catch_throw(self.dispatch)(request)
-                finally:
-                    _request_cv.reset(token)
+            with resource_ctx(self.__class__, request):
+                response = await catch_throw(self.dispatch)(request)
             await response(self.__scope, self.__receive, self.__send)
 
         return func().__await__()
@@ -69,12 +234,10 @@ class Query(QueryBase):
 
 
 class ParameterDecorator(ParameterDecoratorBase):
-    def process_schema_parsing_exception(self, e: z.ValidationError):
-        return _process_schema_parsing_exception(e, self.param.location)
-
+    run_sync_handler = staticmethod(_run_sync)
 
-def _process_schema_parsing_exception(e: z.ValidationError, location: str):
-    return JSONResponse({"in": location, "errors": e.format_errors()}, 422)
+    def validation_error_response(self, content: dict):
+        return _json_response(content, 422)
 
 
 def query(*args, **kwargs):
@@ -82,8 +245,10 @@ def query(*args, **kwargs):
 
 
 class RequestBodyDecorator(RequestBodyDecoratorBase):
-    def process_schema_parsing_exception(self, e: z.ValidationError):
-        return _process_schema_parsing_exception(e, "body")
+    run_sync_handler = staticmethod(_run_sync)
+
+    def validation_error_response(self, content: dict):
+        return _json_response(content, 422)
 
     def request_media_type(self, request: Request, *args, **kwargs):
         return request.headers.get("content-type")
@@ -91,9 +256,41 @@ class RequestBodyDecorator(RequestBodyDecoratorBase):
     def unsupported_media_type(self):
         return Response(status_code=415)
 
+    def content_length(self, request: Request, *args, **kwargs):
+        try:
+            return int(request.headers["content-length"])
+        except (KeyError, ValueError):
+            return None
+
+    def buffer_body(self, body: bytes, request: Request, *args, **kwargs):
+        # as `Request.body` leaves it
+        request._body = body
+
+    def payload_too_large(self):
+        return Response(status_code=413)
+
+    def is_response(self, response):
+        return isinstance(response, Response)
+
     def get_processor_args(self, request, *args, **kwargs):
         return (request,)
 
+    async def abind_data(self, media_type, data, args, kwargs, observation=None):
+        offload: Offload | None = current_context().resource.offload
+        if offload is not None and offload.is_large(
+            self.content_length(*args, **kwargs), data
+        ):
+            return await offload.run(
+                self.bind_data, media_type, data, args, kwargs, observation
+            )
+        return await super().abind_data(media_type, data, args, kwargs, observation)
+
+    def request_stream(self, request: Request, *args, **kwargs):
+        return request.stream()
+
+    def invalid_body(self, message: str):
+        return Response(message, status_code=400, media_type="text/plain")
+
 
 def body(*args, **kwargs):
     return RequestBodyDecorator(*args, **kwargs)
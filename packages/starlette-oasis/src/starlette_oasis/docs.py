@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+from oasis_shared import OpenAPIDocumentEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+
+from ._starlette import PathTemplate, Resource
+
+
+def openapi_json(
+    paths: Mapping[PathTemplate, type[Resource]],
+    *,
+    openapi: str = "3.0.3",
+    info: dict | None = None,
+):
+    endpoint = OpenAPIDocumentEndpoint(paths, openapi=openapi, info=info)
+
+    async def openapi_endpoint(request: Request):
+        status, content, headers = endpoint.respond(
+            request.headers.get("If-None-Match"),
+            request.headers.get("Accept-Encoding"),
+        )
+        return Response(content, status_code=status, headers=headers)
+
+    return openapi_endpoint
@@ -0,0 +1,19 @@
+from oasis_shared import PROMETHEUS_CONTENT_TYPE, Metrics, MetricsSnapshot
+from starlette.requests import Request
+from starlette.responses import Response
+
+from ._starlette import Offload
+
+__all__ = ["Metrics", "MetricsSnapshot", "prometheus"]
+
+
+def prometheus(metrics: Metrics, offload: Offload | None = None):
+    """An endpoint exposing `metrics`, and the pool of `offload`, to Prometheus."""
+
+    async def metrics_endpoint(request: Request):
+        content = metrics.prometheus()
+        if offload is not None:
+            content += offload.prometheus()
+        return Response(content, media_type=PROMETHEUS_CONTENT_TYPE)
+
+    return metrics_endpoint
@@ -0,0 +1,16 @@
+from oasis_shared import (
+    STAGES,
+    ServerTimingBase,
+    StageCollector,
+    StageEvent,
+    StageObserver,
+)
+from starlette.responses import Response
+
+__all__ = ["STAGES", "ServerTiming", "StageCollector", "StageEvent", "StageObserver"]
+
+
+class ServerTiming(ServerTimingBase):
+    def set_header(self, response: Response, name: str, value: str):
+        response.headers[name] = value
+        return response
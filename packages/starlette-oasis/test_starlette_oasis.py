@@ -1,8 +1,11 @@
+import re
+
+import pytest
 import zangar as z
 from starlette.responses import Response
 from starlette.routing import Route
 from starlette.testclient import TestClient
-from starlette_oasis import Resource, input
+from starlette_oasis import MediaType, Resource, input
 
 
 def test_http_405():
@@ -55,3 +58,325 @@ def test_http_422():
             }
         ],
     }
+
+
+def test_openapi_json():
+    from starlette_oasis import PathTemplate
+    from starlette_oasis.docs import openapi_json
+
+    class MyResource(Resource):
+        @input.query("q", z.str())
+        async def get(self, request, q): ...
+
+    client = TestClient(
+        Route("/openapi.json", openapi_json({PathTemplate("/my"): MyResource}))
+    )
+    response = client.get("/openapi.json")
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["paths"] == {"/my": MyResource.spec("3.0.3")}
+
+    response = client.get(
+        "/openapi.json", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert response.status_code == 304
+
+
+def test_responseify_stream():
+    from starlette_oasis import output, responseify_stream
+
+    class MyResource(Resource):
+        @output.response(
+            200, content={"application/json-seq": MediaType(z.struct({"id": z.int()}))}
+        )
+        async def get(self, request):
+            async def rows():
+                for i in range(2):
+                    yield {"id": i}
+
+            return responseify_stream(rows())
+
+    client = TestClient(Route("/", MyResource))
+    response = client.get("/")
+    assert response.headers["content-type"] == "application/json-seq"
+    assert response.content == b'\x1e{"id":0}\n\x1e{"id":1}\n'
+
+
+def test_body_stream():
+    from starlette.responses import JSONResponse
+
+    class MyResource(Resource):
+        @input.body(
+            "rows",
+            content={"application/x-ndjson": MediaType(z.struct({"id": z.int()}))},
+            stream=True,
+        )
+        async def post(self, request, rows):
+            return JSONResponse([row["id"] async for row in rows])
+
+    client = TestClient(Route("/", MyResource))
+    response = client.post(
+        "/",
+        content=b'{"id": 1}\n{"id": 2}',
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.json() == [1, 2]
+
+    response = client.post(
+        "/",
+        content=b'{"id": 1}\n{"id": null}\n',
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 422
+    assert response.json()["errors"][0]["loc"] == [1, "id"]
+
+
+def test_max_bytes_of_chunked_body():
+    from starlette.responses import JSONResponse
+
+    class MyResource(Resource):
+        @input.body(
+            "body",
+            content={"application/json": MediaType(z.list(z.int()))},
+            max_bytes=16,
+        )
+        async def post(self, request, body):
+            return JSONResponse(body)
+
+    client = TestClient(Route("/", MyResource))
+    headers = {"content-type": "application/json"}
+    response = client.post("/", content=iter([b"[1, ", b"2]"]), headers=headers)
+    assert response.json() == [1, 2]
+    response = client.post(
+        "/", content=iter([b"[1, ", b"2, " * 10, b"3]"]), headers=headers
+    )
+    assert response.status_code == 413
+
+
+def test_body_stream_json_array():
+    from starlette.responses import JSONResponse
+
+    class MyResource(Resource):
+        @input.body(
+            "rows",
+            content={"application/json": MediaType(z.struct({"id": z.float()}))},
+            stream=True,
+        )
+        async def post(self, request, rows):
+            return JSONResponse([row["id"] async for row in rows])
+
+    client = TestClient(Route("/", MyResource))
+    chunks = [b'[{"id": 1', b".5}, ", b'{"i', b'd": -', b"2e", b"1}]"]
+    response = client.post(
+        "/", content=iter(chunks), headers={"content-type": "application/json"}
+    )
+    assert response.json() == [1.5, -20]
+
+    chunks = [b'[{"id": 1}, {"id" 2}', b", " * 10, b"]"]
+    response = client.post(
+        "/", content=iter(chunks), headers={"content-type": "application/json"}
+    )
+    assert response.status_code == 400
+
+
+def test_server_timing():
+    from starlette.responses import JSONResponse
+    from starlette_oasis.timing import ServerTiming
+
+    class MyResource(Resource):
+        stage_observer = ServerTiming()
+
+        @input.query("a", z.to.int())
+        async def get(self, request, a):
+            return JSONResponse(a)
+
+    client = TestClient(Route("/", MyResource))
+    response = client.get("/?a=1")
+    assert response.json() == 1
+    assert re.fullmatch(
+        r'parameters;desc="query";dur=[\d.]+, handler;dur=[\d.]+',
+        response.headers["server-timing"],
+    )
+
+    class Nested(Resource):
+        stage_observer = ServerTiming()
+
+        @input.query("v", z.to.int())
+        async def dispatch(self, request, v):
+            return await super().dispatch(request)
+
+        @input.query("a", z.to.int())
+        async def get(self, request, a):
+            return JSONResponse(a)
+
+    client = TestClient(Route("/", Nested))
+    response = client.get("/?v=1&a=2")
+    assert response.json() == 2
+    assert re.fullmatch(
+        r'parameters;desc="query";dur=[\d.]+, parameters;desc="query";dur=[\d.]+, '
+        r"handler;dur=[\d.]+",
+        response.headers["server-timing"],
+    )
+
+
+def test_max_errors():
+    from starlette.responses import JSONResponse
+
+    item = z.struct({"id": z.int()})
+
+    class MyResource(Resource):
+        @input.body(
+            "rows",
+            content={"application/json": MediaType(items=item)},
+            max_errors=2,
+        )
+        async def post(self, request, rows):
+            return JSONResponse(len(rows))
+
+        @input.body(
+            "rows",
+            content={"application/json": MediaType(z.list(item))},
+            max_errors=1,
+        )
+        async def put(self, request, rows): ...
+
+    client = TestClient(Route("/", MyResource))
+    assert client.post("/", json=[{"id": 1}, {"id": 2}]).json() == 2
+
+    response = client.post("/", json=[{"id": "a"}, {"id": 1}, {"id": "b"}, {"id": "c"}])
+    assert response.status_code == 422
+    assert response.json()["truncated"] is True
+    assert [error["loc"] for error in response.json()["errors"]] == [
+        [0, "id"],
+        [2, "id"],
+    ]
+
+    response = client.put("/", json=[{"id": "a"}, {"id": "b"}])
+    assert response.json()["truncated"] is True
+    assert len(response.json()["errors"]) == 1
+
+    with pytest.raises(ValueError):
+        MediaType(z.list(item), items=item)
+
+
+def test_parameters_before_body():
+    read = []
+
+    class MyResource(Resource):
+        @input.body("body", content={"application/json": MediaType(z.int())})
+        @input.query("a", z.to.int())
+        async def post(self, request, body, a):
+            return Response()
+
+    async def processor(request):
+        read.append(request)
+        return await request.json()
+
+    MyResource.register_request_content_processor("application/json", processor)
+    client = TestClient(Route("/", MyResource))
+
+    response = client.post("/?a=x", json=1)
+    assert response.status_code == 422
+    assert response.json()["in"] == "query"
+    assert read == []
+
+    assert client.post("/?a=1", json=1).status_code == 200
+    assert len(read) == 1
+
+
+def test_offload():
+    from starlette_oasis import Offload, aresponseify, output
+    from starlette_oasis.metrics import Metrics, prometheus
+
+    pool = Offload(min_items=3, max_workers=1)
+
+    class MyResource(Resource):
+        offload = pool
+
+        @input.body("rows", content={"application/json": MediaType(z.list(z.int()))})
+        @output.response(200, content={"application/json": MediaType(z.list(z.int()))})
+        async def post(self, request, rows):
+            return await aresponseify(rows)
+
+    client = TestClient(Route("/", MyResource))
+    assert client.post("/", json=[1, 2]).json() == [1, 2]
+    assert pool.completed == 0
+
+    assert client.post("/", json=[1, 2, 3]).json() == [1, 2, 3]
+    assert pool.completed == 2
+    response = client.post("/", json=[1, 2, "a"])
+    assert response.status_code == 422
+    assert response.json()["errors"][0]["loc"] == [2]
+    assert pool.completed == 3
+    assert (pool.queued, pool.running) == (0, 0)
+
+    client = TestClient(Route("/metrics", prometheus(Metrics(), pool)))
+    assert "oasis_offload_completed_total 3" in client.get("/metrics").text
+
+
+def test_chunked_validation():
+    import asyncio
+
+    from starlette_oasis import aresponseify, output
+
+    chunked = MediaType(items=z.int(), chunk_size=2)
+
+    class MyResource(Resource):
+        @input.body("rows", content={"application/json": chunked})
+        @output.response(200, content={"application/json": chunked})
+        async def post(self, request, rows):
+            return await aresponseify(rows)
+
+    client = TestClient(Route("/", MyResource))
+    assert client.post("/", json=[1, 2, 3, 4, 5]).json() == [1, 2, 3, 4, 5]
+
+    rows = [1, "a", 3, 4, "b"]
+    response = client.post("/", json=rows)
+    assert response.status_code == 422
+    try:
+        z.list(z.int()).parse(rows)
+    except z.ValidationError as e:
+        assert response.json()["errors"] == e.format_errors()
+
+    assert asyncio.run(chunked.aparse([1, 2, 3])) == [1, 2, 3]
+    value, errors = asyncio.run(chunked.aparse_items(rows, max_errors=1))
+    assert value is None
+    assert errors.format_errors()[0]["loc"] == [1]
+    with pytest.raises(z.ValidationError):
+        asyncio.run(chunked.aparse(rows))
+
+
+def test_sync_handlers():
+    import threading
+
+    from starlette.responses import JSONResponse
+    from starlette_oasis import output, responseify
+
+    loop_thread = []
+
+    class MyResource(Resource):
+        max_sync_threads = 2
+
+        async def get(self, request):
+            loop_thread.append(threading.get_ident())
+            return JSONResponse(threading.get_ident())
+
+        @input.query("a", z.to.int())
+        @input.body("body", content={"application/json": MediaType(z.list(z.int()))})
+        def post(self, request, a, body):
+            return JSONResponse([threading.get_ident(), a, body])
+
+        @input.query("a", z.to.int())
+        @output.response(200, content={"application/json": MediaType(z.int())})
+        def put(self, request, a):
+            return responseify(a)
+
+    client = TestClient(Route("/", MyResource))
+    with client:
+        client.get("/")
+        thread, a, body = client.post("/?a=1", json=[1, 2]).json()
+        assert thread != loop_thread[0]
+        assert (a, body) == (1, [1, 2])
+        assert client.post("/?a=x", json=[1]).status_code == 422
+        assert client.post("/?a=1", json=["x"]).status_code == 422
+        assert client.put("/?a=2").json() == 2
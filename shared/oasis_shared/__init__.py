@@ -1,20 +1,106 @@
 from __future__ import annotations
 
 import abc
-import contextlib
+import asyncio
 import functools
+import gzip
+import hashlib
 import inspect
 import itertools
+import logging
+import queue
+import random
 import re
-from collections.abc import Callable, Hashable
-from contextvars import ContextVar
+import threading
+import time
+from collections.abc import AsyncIterable, Callable, Hashable, Iterable, Mapping
 from dataclasses import dataclass
 from http import HTTPStatus
 from inspect import iscoroutinefunction
+from types import MappingProxyType
 from typing import Any, NamedTuple
 
 import zangar as z
 
+from ._codecs import (
+    JSON_CODECS,
+    STREAM_CHUNK_SIZE,
+    STREAM_DECODERS,
+    STREAM_FORMATS,
+    JSONCodec,
+    _dumps,
+    current_json_codec,
+    encode_stream,
+    get_json_codec,
+)
+from ._compiler import (
+    _FALLBACK,
+    _compile_schema,
+    _get_schema_spec,
+    _holds_foreign_callables,
+)
+from ._context import RequestContext, _cv_context, current_context, resource_ctx
+from ._metrics import PROMETHEUS_CONTENT_TYPE, Metrics, MetricsSnapshot
+from ._timing import (
+    STAGES,
+    ServerTimingBase,
+    StageCollector,
+    StageEvent,
+    StageObserver,
+)
+
+__all__ = [
+    "JSON_CODECS",
+    "STREAM_CHUNK_SIZE",
+    "STREAM_DECODERS",
+    "STREAM_FORMATS",
+    "JSONCodec",
+    "current_json_codec",
+    "encode_stream",
+    "get_json_codec",
+    "RequestContext",
+    "current_context",
+    "resource_ctx",
+    "PROMETHEUS_CONTENT_TYPE",
+    "Metrics",
+    "MetricsSnapshot",
+    "STAGES",
+    "ServerTimingBase",
+    "StageCollector",
+    "StageEvent",
+    "StageObserver",
+    "HTTP_METHODS",
+    "ResourceBase",
+    "MediaType",
+    "ResponseObject",
+    "RequestParameterObject",
+    "QueryBase",
+    "HeaderBase",
+    "CookieBase",
+    "PathBase",
+    "set_oas_definition",
+    "set_dict",
+    "PathTemplateBase",
+    "openapi_document",
+    "OpenAPIDocumentEndpoint",
+    "ResponseDefinition",
+    "RESPONSE_VALIDATION_MODES",
+    "responseify_base",
+    "aresponseify_base",
+    "responseify",
+    "responseify_stream",
+    "ParameterDecoratorBase",
+    "validation_error_content",
+    "RequestBodyObject",
+    "response",
+    "RequestBodyDecoratorBase",
+    "ThrowValue",
+    "throw",
+    "catch_throw",
+]
+
+logger = logging.getLogger("oasis")
+
 HTTP_METHODS = ["get", "post", "put", "delete", "patch", "head", "options", "trace"]
 
 
@@ -22,13 +108,134 @@ class ResourceBase:
     response_content_processors: dict[str, Callable] = {}
     request_content_processors: dict[str, Callable] = {}
 
+    # the content processors above merged over the MRO, rebuilt on subclassing
+    # and on registration, so requests never walk the MRO.
+    _request_processors: Mapping[str, Callable] = MappingProxyType({})
+    _response_processors: Mapping[str, Callable] = MappingProxyType({})
+
+    _specs: dict[str, dict] = {}
+
+    # How responses are checked against the schema of their media type:
+    # "full", "sampled" (a `response_validation_sample_rate` fraction of them),
+    # "shadow" (checked in a background thread after the response is built, see
+    # `on_response_validation_error`) or "off". Unchecked responses are sent as
+    # returned by the handler, except with schemas that hold transformations
+    # (see `MediaType.transforms`), which are always parsed.
+    response_validation = "full"
+    response_validation_sample_rate = 0.1
+
+    # Name of the JSON codec used by the built-in JSON processors, one of
+    # `JSON_CODECS` or "auto". `None` leaves JSON to the framework.
+    json_codec: str | None = None
+
+    # At most this many errors are reported for an invalid request body, `None`
+    # reports them all. See `max_errors` of the body decorator.
+    max_validation_errors: int | None = None
+
+    # Requests with more query keys than this are rejected with 422 before their
+    # query parameters are parsed, `None` for no limit. It applies to every
+    # operation, whether it declares query parameters or not.
+    max_query_keys: int | None = None
+
+    # A `StageObserver` receiving the timing of each stage of the requests of
+    # this resource. `None` skips the instrumentation altogether.
+    stage_observer: StageObserver | None = None
+
+    # The `Metrics` the requests of this resource are counted in, `None` counts
+    # nothing. Set it on a common base class to aggregate a whole API.
+    metrics: Metrics | None = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._merge_content_processors()
+        cls._specs = {}
+
+    @classmethod
+    def _merge_content_processors(cls):
+        request: dict[str, Callable] = {}
+        response: dict[str, Callable] = {}
+        for res in reversed(inspect.getmro(cls)):
+            if issubclass(res, ResourceBase):
+                request.update(res.request_content_processors)
+                response.update(res.response_content_processors)
+        cls._request_processors = MappingProxyType(request)
+        cls._response_processors = MappingProxyType(response)
+        for subclass in cls.__subclasses__():
+            subclass._merge_content_processors()
+
+    @classmethod
+    def register_request_content_processor(cls, media_type: str, processor):
+        """
+        Register a request content processor after the class has been created.
+
+        Mutating `request_content_processors` in place is not seen by the class
+        or its subclasses, use this instead.
+        """
+        processors = dict(cls.__dict__.get("request_content_processors", {}))
+        processors[media_type] = processor
+        cls.request_content_processors = processors
+        cls._merge_content_processors()
+        return processor
+
+    @classmethod
+    def register_response_content_processor(cls, media_type: str, processor):
+        """
+        Register a response content processor after the class has been created.
+
+        Mutating `response_content_processors` in place is not seen by the class
+        or its subclasses, use this instead.
+        """
+        processors = dict(cls.__dict__.get("response_content_processors", {}))
+        processors[media_type] = processor
+        cls.response_content_processors = processors
+        cls._merge_content_processors()
+        return processor
+
     def dispatch(self, *args, **kwargs):
         raise NotImplementedError
 
+    @classmethod
+    def query_argumentset(cls, *args, **kwargs) -> Mapping | None:
+        """
+        The query of the request, to check `max_query_keys` for the operations
+        declaring no query parameter. `None` leaves them unchecked.
+        """
+        return None
+
+    @classmethod
+    def validation_error_response(cls, content: dict):
+        """The 422 response with the JSON `content`, see `validation_error_content`."""
+        raise NotImplementedError
+
+    @classmethod
+    def on_response_validation_error(
+        cls, definition: ResponseDefinition, value, error: z.ValidationError
+    ):
+        """Receives the invalid responses found by "shadow" validation."""
+        logger.warning(
+            "Invalid %s response of %s (%s): %s",
+            definition.status,
+            cls.__qualname__,
+            definition.media_type,
+            error.format_errors(),
+        )
+
     @classmethod
     def spec(cls, openapi: str):
-        """Path Item Object of OAS"""
+        """
+        Path Item Object of OAS
+
+        It is built once per class and OpenAPI version, every call returns a
+        copy of it, so the caller is free to modify the result.
+        """
+        try:
+            rv = cls._specs[openapi]
+        except KeyError:
+            rv = cls._specs[openapi] = cls._build_spec(openapi)
+        return _copy_spec(rv)
 
+    @classmethod
+    def _build_spec(cls, openapi: str):
         rv = {}
 
         definitions = getattr(cls.dispatch, _OAS_DEFINITIONS, [])
@@ -71,41 +278,226 @@ class ResourceBase:
         return rv
 
 
-_cv_resource: ContextVar[type[ResourceBase]] = ContextVar("current_resource")
+# @@248
+class _Observation:
+    """
+    One request to a resource with a `stage_observer` or `metrics`, made by its
+    outermost operation and shared by the nested ones. The stage events are
+    only made for a `stage_observer`.
+    """
 
+    __slots__ = (
+        "observer",
+        "metrics",
+        "resource",
+        "method",
+        "events",
+        "start_time",
+        "rejection",
+    )
 
-@contextlib.contextmanager
-def resource_ctx(resource: type[ResourceBase]):
-    token = _cv_resource.set(resource)
-    try:
-        yield
-    finally:
-        _cv_resource.reset(token)
+    def __init__(self, resource: type[ResourceBase], method: str):
+        self.observer = resource.stage_observer
+        self.metrics = resource.metrics
+        self.resource = resource
+        self.method = method
+        self.events: list[StageEvent] = []
+        self.start_time = time.perf_counter()
+        # the stage an operation of the request stopped at
+        self.rejection: _ShortCircuit | None = None
+
+    def start(self, stage: str, name=None, location=None, media_type=None):
+        if self.observer is None:
+            return None
+        event = StageEvent(
+            stage, self.resource, self.method, name, location, media_type
+        )
+        event.start = time.perf_counter()
+        self.observer.stage_start(event)
+        return event
+
+    def end(self, event: StageEvent | None):
+        if event is None:
+            return
+        event.end = time.perf_counter()
+        self.events.append(event)
+        self.observer.stage_end(event)
+
+    def record(self):
+        if self.metrics is not None:
+            self.metrics.record(
+                self.resource,
+                self.method,
+                time.perf_counter() - self.start_time,
+                self.rejection,
+            )
+
+    def request_end(self, response):
+        self.record()
+        if self.observer is not None:
+            response = self.observer.request_end(self.events, response)
+        return response
+
+    def request_failed(self, event: StageEvent | None, error: BaseException):
+        """
+        Ends the request of a handler that raised `error`. The value of a
+        `ThrowValue` is the response, any other error has none to report to the
+        `stage_observer`, only the `metrics` count it.
+        """
+        self.end(event)
+        if isinstance(error, ThrowValue):
+            if error.rejection is not None:
+                self.rejection = error.rejection
+            error.value = self.request_end(error.value)
+        else:
+            self.record()
+
+
+# @@638
+# The specs of each schema by openapi version, shared by the media types and
+# parameters declaring the same schema. Keyed by the id of the schema, which is
+# held so that its id is never reused.
+_schema_specs: dict[int, tuple[Any, dict[str, dict]]] = {}
 
 
-def _get_schema_spec(schema, openapi: str):
-    if tuple(map(int, openapi.split(".")))[:2] == (3, 0):
-        from zangar.compilation import OpenAPI30Compiler
+def _get_cached_schema_spec(schema, openapi: str):
+    entry = _schema_specs.get(id(schema))
+    if entry is None:
+        entry = _schema_specs.setdefault(id(schema), (schema, {}))
+    cache = entry[1]
+    try:
+        return cache[openapi]
+    except KeyError:
+        rv = cache[openapi] = _get_schema_spec(schema, openapi)
+        return rv
+
 
-        return OpenAPI30Compiler().compile(schema)
-    raise NotImplementedError(f"Unsupported openapi: {openapi}")
+def _copy_spec(value):
+    """A faster `copy.deepcopy` for JSON-like data."""
+    if isinstance(value, dict):
+        return {k: _copy_spec(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_copy_spec(v) for v in value]
+    return value
 
 
 class MediaType:
-    def __init__(self, schema: z.Schema | None = None):
+    def __init__(
+        self,
+        schema: z.Schema | None = None,
+        *,
+        items: z.Schema | None = None,
+        compiled: bool = False,
+        chunk_size: int | None = None,
+    ):
+        """
+        :param items: The schema of the items of a JSON array, in place of
+            `schema`, which is then a plain list of it. A request body is then
+            validated item by item, so that with `max_errors` an invalid bulk
+            upload costs up to its first failing items instead of the whole
+            array. List-level checks would be skipped by that, so they can't be
+            combined with `items`.
+        :param compiled: Parse values with a function generated from the
+            OpenAPI description of `schema` on first use, which accepts values
+            that are already valid in a single pass and leaves everything else
+            to `schema`. Schemas with custom transformations or checks, such as
+            `transform` or `ensure`, which the description doesn't show, are
+            always parsed by `schema` itself.
+        :param chunk_size: Validate an array against `items` this many items at
+            a time in async handlers, yielding to the event loop in between, so
+            that a large body or response doesn't hold up the other requests.
+        """
+        if chunk_size is not None and (items is None or chunk_size < 1):
+            raise ValueError("chunk_size needs items, and must be at least 1")
+        if items is not None:
+            if schema is not None:
+                raise ValueError("Pass either schema or items, not both")
+            schema = z.list(items)
         self.__schema = schema
+        self.items = items
+        self.chunk_size = chunk_size
+        self.__compiled = _FALLBACK if compiled and schema is not None else None
+
+    @functools.cached_property
+    def transforms(self) -> bool:
+        """
+        Whether parsing may change values, conservatively: the schema holds
+        callables from outside zangar, such as the function of a `transform`
+        or an `ensure`, or a `z.dataclass`.
+        """
+        return self.__schema is not None and _holds_foreign_callables(
+            self.__schema, set()
+        )
+
+    @property
+    def compiled_source(self) -> str | None:
+        """The source of the compiled parser, if there is one."""
+        return getattr(self.__get_compiled(), "__source__", None)
+
+    def __get_compiled(self):
+        if self.__compiled is _FALLBACK:
+            self.__compiled = (
+                None if self.transforms else _compile_schema(self.__schema)
+            )
+        return self.__compiled
 
     def spec(self, openapi: str):
         rv = {}
         if self.__schema:
-            rv["schema"] = _get_schema_spec(self.__schema, openapi)
+            rv["schema"] = _get_cached_schema_spec(self.__schema, openapi)
         return rv
 
     def parse(self, value):
         if self.__schema:
+            if self.__compiled is not None:
+                return self.__parse_compiled(value)
             return self.__schema.parse(value)
         return value
 
+    async def aparse_items(self, value: list, max_errors: int | None = None):
+        """
+        Parses the items of the array `value` `chunk_size` at a time, yielding
+        to the event loop in between, and stopping at the `max_errors`th
+        invalid one. Returns the parsed items and None, or None and the errors,
+        located like those of the list schema.
+        """
+        parse = self.items.parse
+        rv = []
+        errors = []
+        for start in range(0, len(value), self.chunk_size):
+            if start:
+                await asyncio.sleep(0)
+            for index in range(start, min(start + self.chunk_size, len(value))):
+                try:
+                    rv.append(parse(value[index]))
+                except z.ValidationError as e:
+                    errors.append(_ItemValidationError(index, e))
+                    if len(errors) == max_errors:
+                        return None, _CappedValidationError(
+                            _ValidationErrors(errors),
+                            max_errors,
+                            truncated=index < len(value) - 1,
+                        )
+        if errors:
+            return None, _ValidationErrors(errors)
+        return rv, None
+
+    async def aparse(self, value):
+        """`parse`, with the items of an array parsed by `aparse_items`."""
+        if self.chunk_size is None or not isinstance(value, list):
+            return self.parse(value)
+        rv, errors = await self.aparse_items(value)
+        if errors is not None:
+            raise _ItemsValidationError(errors)
+        return rv
+
+    def __parse_compiled(self, value):
+        compiled = self.__get_compiled()
+        rv = _FALLBACK if compiled is None else compiled(value)
+        if rv is _FALLBACK:
+            return self.__schema.parse(value)
+        return rv
+
 
 class ResponseObject:
     def __init__(
@@ -141,11 +533,31 @@ class RequestParameterObject:
         *,
         required=True,
         description: str | None = None,
+        max_length: int | None = None,
+        max_items: int | None = None,
     ):
+        """
+        :param max_length: The maximum length of the raw value, checked before
+            it is parsed. Too long headers are rejected with 431, other
+            locations with 422.
+        :param max_items: The maximum number of values of a repeated parameter,
+            such as `?id=1&id=2`.
+        """
         self.name = name
         self.__schema = schema
         self.__required = required
         self.__description = description
+        self.max_length = max_length
+        self.max_items = max_items
+
+        # built once here rather than on every request
+        field = z.field(schema)
+        if not required:
+            field = field.optional()
+        self._field = field
+        self._struct = z.struct({name: field})
+        # the whole argument set is the value of the parameter
+        self._nested = isinstance(schema, (z.struct, z.dataclass))
 
     def spec(self, openapi: str):
         rv = {
@@ -153,7 +565,7 @@ class RequestParameterObject:
             "in": self.location,
         }
         if self.__schema:
-            rv["schema"] = _get_schema_spec(self.__schema, openapi)
+            rv["schema"] = _get_cached_schema_spec(self.__schema, openapi)
         if self.__required:
             rv["required"] = True
         if self.__description is not None:
@@ -162,13 +574,9 @@ class RequestParameterObject:
 
     def parse_request(self, *args, **kwargs):
         argumentset = self.get_argumentset(*args, **kwargs)
-        if isinstance(self.__schema, (z.struct, z.dataclass)):
+        if self._nested:
             argumentset = {self.name: argumentset}
-
-        field = z.field(self.__schema)
-        if not self.__required:
-            field = field.optional()
-        return z.struct({self.name: field}).parse(argumentset)
+        return self._struct.parse(argumentset)
 
     def get_argumentset(self, *args, **kwargs):
         raise NotImplementedError(self)
@@ -202,6 +610,314 @@ def set_oas_definition(func, definition):
     getattr(func, _OAS_DEFINITIONS).append(definition)
 
 
+_OAS_OPERATION = "__oasis_operation"
+
+
+class _ShortCircuit:
+    """
+    A stage answers the request without running the handler by returning
+    `(short_circuit, response)` in place of `(args, kwargs)`, which is much
+    cheaper than raising through `throw` when most requests are invalid.
+
+    `reason` is "unsupported_media_type", "invalid" (with the failing
+    `locations`), "payload_too_large", "header_fields_too_large" or "response"
+    for a response of the request content processor.
+    """
+
+    __slots__ = ("reason", "locations")
+
+    def __init__(self, reason: str, locations: tuple[str, ...] = ()):
+        self.reason = reason
+        self.locations = locations
+
+
+_UNSUPPORTED_MEDIA_TYPE = _ShortCircuit("unsupported_media_type")
+_INVALID_BODY = _ShortCircuit("invalid", ("body",))
+_PROCESSOR_RESPONSE = _ShortCircuit("response")
+_PAYLOAD_TOO_LARGE = _ShortCircuit("payload_too_large")
+_HEADER_FIELDS_TOO_LARGE = _ShortCircuit("header_fields_too_large")
+
+
+class _Operation:
+    """
+    All the input and output declarations stacked on one handler.
+
+    The decorators do not wrap the handler one by one, they register themselves
+    here and the handler is run by a single flat invoker.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.inputs: list = []  # innermost first
+        self.responses: list[ResponseDefinition] = []  # innermost first
+        self.invoker: Callable | None = None
+        # awaits a sync handler from the async invoker of an async framework
+        self.run_sync: Callable | None = None
+        self._plan: tuple | None = None
+
+    def copy(self):
+        rv = _Operation(self.func)
+        rv.inputs = list(self.inputs)
+        rv.responses = list(self.responses)
+        rv.run_sync = self.run_sync
+        return rv
+
+    def add_input(self, decorator):
+        self.inputs.append(decorator)
+        self._plan = None
+
+    def add_responses(self, definitions: list[ResponseDefinition]):
+        self.responses.extend(definitions)
+        self._plan = None
+
+    def compile(self):
+        # the outermost decorator runs first
+        inputs = list(reversed(self.inputs))
+        parameters = [
+            stage for stage in inputs if isinstance(stage, ParameterDecoratorBase)
+        ]
+        if parameters:
+            # All the parameters are validated in a single pass, before the body
+            # whatever the order of the decorators, so that a request with invalid
+            # parameters is rejected without reading its body.
+            inputs = [_ParameterBatch(parameters)] + [
+                stage for stage in inputs if stage not in parameters
+            ]
+        if not any(stage.param.location == "query" for stage in parameters):
+            # `max_query_keys` applies to every operation
+            inputs.insert(0, _QUERY_KEY_LIMIT)
+        inputs = tuple(inputs)
+        if iscoroutinefunction(self.func) or self.run_sync is not None:
+            inputs = tuple(
+                (getattr(stage, "abind", None) or stage.bind, hasattr(stage, "abind"))
+                for stage in inputs
+            )
+        responses = _ResponseIndex(tuple(self.responses)) if self.responses else None
+        self._plan = (inputs, responses)
+        return self._plan
+
+
+def _get_invoker(func, run_sync: Callable | None = None):
+    """
+    A new invoker of `func`. When `func` is itself an invoker, as with stacked
+    decorators, the new one runs a copy of its operation, so that decorating a
+    handler again, such as the method of a parent class, leaves it untouched.
+
+    :param run_sync: Awaits a sync handler, as `run_sync(func, *args, **kwargs)`.
+        Sync handlers then get an async invoker, which binds the inputs with
+        their async stages.
+    """
+    operation: _Operation | None = getattr(func, _OAS_OPERATION, None)
+    if operation is not None and operation.invoker is func:
+        operation = operation.copy()
+    else:
+        operation = _Operation(func)
+    if run_sync is not None and not iscoroutinefunction(operation.func):
+        operation.run_sync = run_sync
+    invoker = _build_invoker(operation, func)
+    # `functools.wraps` shares the definitions of `func`, the spec gets a copy
+    definitions = getattr(invoker, _OAS_DEFINITIONS, None)
+    if definitions is not None:
+        setattr(invoker, _OAS_DEFINITIONS, list(definitions))
+    return invoker
+
+
+def _build_invoker(operation: _Operation, wrapped):
+    func = operation.func
+    if operation.run_sync is not None:
+        run_sync = operation.run_sync
+
+        @functools.wraps(func)
+        async def handler(*args, **kwargs):
+            return await run_sync(func, *args, **kwargs)
+
+    else:
+        handler = func
+
+    if iscoroutinefunction(handler):
+
+        @functools.wraps(wrapped)
+        async def invoker(*args, **kwargs):
+            inputs, responses = operation._plan or operation.compile()
+            ctx = _cv_context.get(None)
+            if ctx is None:
+                return await _ainvoke_without_context(invoker, args, kwargs)
+            outer = ctx.responses
+            if responses is not None:
+                ctx.responses = responses if outer is None else responses.chain(outer)
+            try:
+                if args and (
+                    getattr(args[0], "stage_observer", None) is not None
+                    or getattr(args[0], "metrics", None) is not None
+                ):
+                    return await _ainvoke_observed(handler, inputs, ctx, args, kwargs)
+                # every operation has inputs, a handler called without a
+                # resource only has its responses
+                if args:
+                    res, args = args[0], args[1:]
+                    for bind, is_async in inputs:
+                        if is_async:
+                            args, kwargs = await bind(args, kwargs)
+                        else:
+                            args, kwargs = bind(args, kwargs)
+                        if args.__class__ is _ShortCircuit:
+                            return kwargs
+                    ctx.parameters = kwargs
+                    return await handler(res, *args, **kwargs)
+                return await handler(*args, **kwargs)
+            finally:
+                ctx.responses = outer
+
+    else:
+
+        @functools.wraps(wrapped)
+        def invoker(*args, **kwargs):
+            inputs, responses = operation._plan or operation.compile()
+            ctx = _cv_context.get(None)
+            if ctx is None:
+                return _invoke_without_context(invoker, args, kwargs)
+            outer = ctx.responses
+            if responses is not None:
+                ctx.responses = responses if outer is None else responses.chain(outer)
+            try:
+                if args and (
+                    getattr(args[0], "stage_observer", None) is not None
+                    or getattr(args[0], "metrics", None) is not None
+                ):
+                    response = _invoke_observed(func, inputs, ctx, args, kwargs)
+                elif args:
+                    res, args = args[0], args[1:]
+                    for stage in inputs:
+                        args, kwargs = stage.bind(args, kwargs)
+                        if args.__class__ is _ShortCircuit:
+                            return kwargs
+                    ctx.parameters = kwargs
+                    response = func(res, *args, **kwargs)
+                else:
+                    response = func(*args, **kwargs)
+            finally:
+                current, ctx.responses = ctx.responses, outer
+            if responses is not None and inspect.iscoroutine(response):
+                # A sync handler calling a coroutine method, as a `dispatch`
+                # may, the coroutine only runs once the adapter awaits it.
+                return _await_with_responses(response, ctx, current)
+            return response
+
+    setattr(invoker, _OAS_OPERATION, operation)
+    operation.invoker = invoker
+    return invoker
+
+
+def _invoke_without_context(invoker, args, kwargs):
+    # called directly, not through the view of a resource
+    with resource_ctx(type(args[0]) if args else ResourceBase):
+        return invoker(*args, **kwargs)
+
+
+async def _ainvoke_without_context(invoker, args, kwargs):
+    with resource_ctx(type(args[0]) if args else ResourceBase):
+        return await invoker(*args, **kwargs)
+
+
+def _begin_observation(handler, ctx: RequestContext):
+    """
+    The observation of the request, and whether this operation is the outermost
+    one of the request, such as a decorated `dispatch`, which owns it.
+    """
+    if ctx.observation is not None:
+        return ctx.observation, False
+    method = getattr(ctx.request, "method", None)
+    method = method.lower() if isinstance(method, str) else handler.__name__
+    ctx.observation = _Observation(ctx.resource, method)
+    return ctx.observation, True
+
+
+async def _await_with_responses(coro, ctx: RequestContext, responses):
+    """Awaits `coro` with the response definitions of its operation in effect."""
+    outer, ctx.responses = ctx.responses, responses
+    try:
+        return await coro
+    finally:
+        ctx.responses = outer
+
+
+def _invoke_observed(handler, inputs, ctx: RequestContext, args, kwargs):
+    res, args = args[0], args[1:]
+    observation, outermost = _begin_observation(handler, ctx)
+    event = None
+    try:
+        for stage in inputs:
+            args, kwargs = stage.bind(args, kwargs, observation)
+            if args.__class__ is _ShortCircuit:
+                observation.rejection = args
+                response = kwargs
+                break
+        else:
+            ctx.parameters = kwargs
+            # the handler of the outermost operation includes the inner ones
+            event = observation.start("handler") if outermost else None
+            response = handler(res, *args, **kwargs)
+            if outermost and inspect.iscoroutine(response):
+                # a sync `dispatch` calling a coroutine method, the request ends
+                # once the adapter has awaited it
+                response = _await_observed(response, ctx, observation, event)
+                outermost = False
+    except BaseException as e:
+        if outermost:
+            observation.request_failed(event, e)
+        raise
+    finally:
+        if outermost:
+            ctx.observation = None
+    if outermost:
+        observation.end(event)
+        response = observation.request_end(response)
+    return response
+
+
+async def _await_observed(coro, ctx: RequestContext, observation, event):
+    try:
+        response = await coro
+    except BaseException as e:
+        observation.request_failed(event, e)
+        raise
+    finally:
+        ctx.observation = None
+    observation.end(event)
+    return observation.request_end(response)
+
+
+async def _ainvoke_observed(handler, inputs, ctx: RequestContext, args, kwargs):
+    res, args = args[0], args[1:]
+    observation, outermost = _begin_observation(handler, ctx)
+    event = None
+    try:
+        for bind, is_async in inputs:
+            if is_async:
+                args, kwargs = await bind(args, kwargs, observation)
+            else:
+                args, kwargs = bind(args, kwargs, observation)
+            if args.__class__ is _ShortCircuit:
+                observation.rejection = args
+                response = kwargs
+                break
+        else:
+            ctx.parameters = kwargs
+            event = observation.start("handler") if outermost else None
+            response = await handler(res, *args, **kwargs)
+    except BaseException as e:
+        if outermost:
+            observation.request_failed(event, e)
+        raise
+    finally:
+        if outermost:
+            ctx.observation = None
+    if outermost:
+        observation.end(event)
+        response = observation.request_end(response)
+    return response
+
+
 def set_dict(data: dict, path: list[Hashable], setter: Callable[[Any], Any]):
     """
     >>> data = {}
@@ -256,15 +972,292 @@ class PathTemplateBase:
         return "/" + "/".join(parts)
 
 
+def openapi_document(
+    paths: Mapping[PathTemplateBase, type[ResourceBase]],
+    *,
+    openapi: str = "3.0.3",
+    info: dict | None = None,
+):
+    """OpenAPI Object of the resources in `paths`."""
+    return {
+        "openapi": openapi,
+        "info": info or {"title": "API Document", "version": "0.1.0"},
+        "paths": {
+            path.openapi_path: resource.spec(openapi)
+            for path, resource in paths.items()
+        },
+    }
+
+
+def _accepts_gzip(accept_encoding: str | None):
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            params = params.strip().lower()
+            if params.startswith("q="):
+                try:
+                    return float(params[2:]) > 0
+                except ValueError:
+                    return False
+            return True
+    return False
+
+
+def _etag_matches(if_none_match: str | None, etag: str):
+    if if_none_match is None:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class OpenAPIDocumentEndpoint:
+    """
+    Serves the OpenAPI document of `paths`.
+
+    The document is assembled, serialized and gzip-compressed once, on the first
+    request, and each variant gets a strong ETag.
+    """
+
+    def __init__(
+        self,
+        paths: Mapping[PathTemplateBase, type[ResourceBase]],
+        *,
+        openapi: str = "3.0.3",
+        info: dict | None = None,
+    ):
+        self.__paths = paths
+        self.__openapi = openapi
+        self.__info = info
+        self.__variants: tuple[tuple[bytes, str], tuple[bytes, str]] | None = None
+
+    def __serialize(self):
+        content = _dumps(
+            openapi_document(self.__paths, openapi=self.__openapi, info=self.__info)
+        )
+        digest = hashlib.sha1(content).hexdigest()
+        return (
+            (content, f'"{digest}"'),
+            (gzip.compress(content, mtime=0), f'"{digest}-gzip"'),
+        )
+
+    def respond(
+        self, if_none_match: str | None, accept_encoding: str | None
+    ) -> tuple[int, bytes, dict[str, str]]:
+        """Status, body and headers of the response to a request."""
+        if self.__variants is None:
+            self.__variants = self.__serialize()
+        identity, gzipped = self.__variants
+
+        headers = {"Content-Type": "application/json", "Vary": "Accept-Encoding"}
+        if _accepts_gzip(accept_encoding):
+            content, headers["ETag"] = gzipped
+            headers["Content-Encoding"] = "gzip"
+        else:
+            content, headers["ETag"] = identity
+
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return 304, b"", {"ETag": headers["ETag"], "Vary": "Accept-Encoding"}
+        return 200, content, headers
+
+
 class ResponseDefinition(NamedTuple):
     status: int
     media_type: str
     media_type_object: MediaType
+    validation: str | None = None
+
+
+class _ResponseIndex:
+    """Response definitions of an operation, indexed for `responseify`."""
+
+    def __init__(self, definitions: tuple[ResponseDefinition, ...]):
+        self.definitions = definitions
+        by_status: dict[int, list[ResponseDefinition]] = {}
+        by_media_type: dict[str, list[ResponseDefinition]] = {}
+        by_key: dict[tuple[int, str], list[ResponseDefinition]] = {}
+        for d in definitions:
+            by_status.setdefault(d.status, []).append(d)
+            by_media_type.setdefault(d.media_type, []).append(d)
+            by_key.setdefault((d.status, d.media_type), []).append(d)
+        self.by_status = {k: tuple(v) for k, v in by_status.items()}
+        self.by_media_type = {k: tuple(v) for k, v in by_media_type.items()}
+        self.by_key = {k: tuple(v) for k, v in by_key.items()}
+        self.__chains: dict[_ResponseIndex, _ResponseIndex] = {}
+
+    def chain(self, outer: _ResponseIndex) -> _ResponseIndex:
+        """These definitions followed by the ones of the enclosing operation."""
+        try:
+            return self.__chains[outer]
+        except KeyError:
+            rv = self.__chains[outer] = _ResponseIndex(
+                self.definitions + outer.definitions
+            )
+            return rv
+
+    def find(self, status: int | None, media_type: str | None):
+        if status is None:
+            if media_type is None:
+                return self.definitions
+            return self.by_media_type.get(media_type, ())
+        if media_type is None:
+            return self.by_status.get(status, ())
+        return self.by_key.get((status, media_type), ())
+
+
+def _get_response_definition(status: int | None, media_type: str | None):
+    ctx = _cv_context.get()
+    index = ctx.responses
+    descriptions = () if index is None else index.find(status, media_type)
 
+    length = len(descriptions)
+    if length > 1:
+        raise RuntimeError(f"Multiple {MediaType.__name__} found")
+    elif length == 0:
+        raise RuntimeError(f"No {MediaType.__name__} found")
 
-response_definitions: ContextVar[list[ResponseDefinition]] = ContextVar(
-    "response_definitions"
-)
+    d = descriptions[0]
+    try:
+        processor = ctx.resource._response_processors[d.media_type]
+    except KeyError:
+        raise NotImplementedError(d.media_type) from None
+    return ctx, d, processor
+
+
+RESPONSE_VALIDATION_MODES = ("full", "sampled", "shadow", "off")
+
+
+def _check_response_validation_mode(mode: str):
+    if mode not in RESPONSE_VALIDATION_MODES:
+        raise ValueError(f"Unknown response validation mode: {mode!r}")
+    return mode
+
+
+def _response_validation_mode(resource: type[ResourceBase], d: ResponseDefinition):
+    """
+    The mode for this response, with "sampled" resolved to "full" or "off", and
+    always "full" when the schema transforms values, which then can't be sent
+    as returned.
+    """
+    mode = _check_response_validation_mode(d.validation or resource.response_validation)
+    if mode != "full" and d.media_type_object.transforms:
+        return "full"
+    if mode == "sampled":
+        if random.random() < resource.response_validation_sample_rate:
+            return "full"
+        return "off"
+    return mode
+
+
+class _ShadowValidator:
+    """
+    Validates responses in a background thread. Its queue is bounded: values
+    submitted while it is full are not validated, and counted in `dropped` and
+    in the "shadow_validation_dropped" metric.
+    """
+
+    MAX_QUEUED = 256
+    # values of a stream validated by one task
+    BATCH_SIZE = 100
+
+    def __init__(self):
+        self.queue: queue.Queue = queue.Queue(self.MAX_QUEUED)
+        self.dropped = 0
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        resource: type[ResourceBase],
+        d: ResponseDefinition,
+        values: list,
+        observation: _Observation | None,
+    ):
+        if self._thread is None or not self._thread.is_alive():  # or forked
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run,
+                        name="oasis-shadow-validation",
+                        daemon=True,
+                    )
+                    self._thread.start()
+        try:
+            self.queue.put_nowait((resource, d, values, observation))
+        except queue.Full:
+            self.dropped += len(values)
+            if observation is not None and observation.metrics is not None:
+                observation.metrics.record_shadow_validation_dropped(
+                    resource, observation.method, len(values)
+                )
+
+    def _run(self):
+        while True:
+            resource, d, values, observation = self.queue.get()
+            for value in values:
+                try:
+                    d.media_type_object.parse(value)
+                except z.ValidationError as e:
+                    if observation is not None and observation.metrics is not None:
+                        observation.metrics.record_response_validation_failure(
+                            resource, observation.method
+                        )
+                    resource.on_response_validation_error(d, value, e)
+                except Exception:
+                    logger.exception("Shadow validation of a response failed")
+
+
+_shadow_validator = _ShadowValidator()
+
+
+def _validate_in_shadow(
+    resource: type[ResourceBase],
+    d: ResponseDefinition,
+    value,
+    observation: _Observation | None,
+):
+    _shadow_validator.submit(resource, d, [value], observation)
+
+
+def _shadow_batches(
+    resource: type[ResourceBase],
+    d: ResponseDefinition,
+    iterable: Iterable,
+    observation: _Observation | None,
+):
+    """Yields `iterable`, submitting its items for shadow validation by batches."""
+    batch = []
+    try:
+        for item in iterable:
+            batch.append(item)
+            if len(batch) == _ShadowValidator.BATCH_SIZE:
+                _shadow_validator.submit(resource, d, batch, observation)
+                batch = []
+            yield item
+    finally:
+        if batch:
+            _shadow_validator.submit(resource, d, batch, observation)
+
+
+async def _ashadow_batches(
+    resource: type[ResourceBase],
+    d: ResponseDefinition,
+    iterable: AsyncIterable,
+    observation: _Observation | None,
+):
+    batch = []
+    try:
+        async for item in iterable:
+            batch.append(item)
+            if len(batch) == _ShadowValidator.BATCH_SIZE:
+                _shadow_validator.submit(resource, d, batch, observation)
+                batch = []
+            yield item
+    finally:
+        if batch:
+            _shadow_validator.submit(resource, d, batch, observation)
 
 
 def responseify_base(
@@ -274,77 +1267,390 @@ def responseify_base(
     status: int | None = None,
     media_type: str | None = None,
 ):
-    descriptions = response_definitions.get([])
+    ctx, d, processor = _get_response_definition(status, media_type)
+    return _responseify(
+        ctx, d, processor, _response_validation_mode(ctx.resource, d), raw
+    )
 
-    # filter by status and media_type
-    if status is not None:
-        descriptions = filter(lambda x: x.status == status, descriptions)
-    if media_type is not None:
-        descriptions = filter(lambda x: x.media_type == media_type, descriptions)
 
-    descriptions = list(descriptions)
-    length = len(descriptions)
-    if length > 1:
-        raise RuntimeError(f"Multiple {MediaType.__name__} found")
-    elif length == 0:
-        raise RuntimeError(f"No {MediaType.__name__} found")
+async def aresponseify_base(
+    raw,
+    /,
+    *,
+    status: int | None = None,
+    media_type: str | None = None,
+):
+    """
+    `responseify_base` for async handlers, validating an array against a media
+    type with `chunk_size` without blocking the event loop.
+    """
+    ctx, d, processor = _get_response_definition(status, media_type)
+    mode = _response_validation_mode(ctx.resource, d)
+    if mode == "full" and d.media_type_object.chunk_size is not None:
+        observation = ctx.observation
+        if observation is not None:
+            event = observation.start("response_validation", media_type=d.media_type)
+        try:
+            raw = await d.media_type_object.aparse(raw)
+        except z.ValidationError:
+            if observation is not None and observation.metrics is not None:
+                observation.metrics.record_response_validation_failure(
+                    ctx.resource, observation.method
+                )
+            raise
+        if observation is not None:
+            observation.end(event)
+        mode = "off"
+    return _responseify(ctx, d, processor, mode, raw)
+
+
+def _responseify(ctx: RequestContext, d: ResponseDefinition, processor, mode: str, raw):
+    resource = ctx.resource
+    observation = ctx.observation
+    if observation is None:
+        if mode == "full":
+            return processor(
+                dict(
+                    data=d.media_type_object.parse(raw),
+                    status=d.status,
+                )
+            )
+        response = processor(dict(data=raw, status=d.status))
+    else:
+        data = raw
+        if mode == "full":
+            event = observation.start("response_validation", media_type=d.media_type)
+            try:
+                data = d.media_type_object.parse(raw)
+            except z.ValidationError:
+                if observation.metrics is not None:
+                    observation.metrics.record_response_validation_failure(
+                        resource, observation.method
+                    )
+                raise
+            observation.end(event)
+        event = observation.start("serialization", media_type=d.media_type)
+        response = processor(dict(data=data, status=d.status))
+        observation.end(event)
+    if mode == "shadow":
+        _validate_in_shadow(resource, d, raw, observation)
+    return response
 
-    d = descriptions[0]
 
-    resource = _cv_resource.get()
-    for res in inspect.getmro(resource):
-        if issubclass(res, ResourceBase):
-            if d.media_type in res.response_content_processors:
-                processor = res.response_content_processors[d.media_type]
-                break
+responseify = responseify_base
+
+
+def responseify_stream(
+    iterable: Iterable | AsyncIterable,
+    /,
+    *,
+    status: int | None = None,
+    media_type: str | None = None,
+):
+    """
+    Like `responseify`, but for a sync or async iterable, for streaming media
+    types such as "application/x-ndjson". The schema of the media type is the
+    schema of one item, each item is validated as it is sent.
+    """
+    ctx, d, processor = _get_response_definition(status, media_type)
+    resource, observation = ctx.resource, ctx.observation
+    mode = _response_validation_mode(resource, d)
+    convert = d.media_type_object.parse if mode == "full" else None
+
+    if mode == "shadow":
+        if isinstance(iterable, AsyncIterable):
+            data = _ashadow_batches(resource, d, iterable, observation)
+        else:
+            data = _shadow_batches(resource, d, iterable, observation)
+    elif convert is None:
+        data = iterable
+    elif isinstance(iterable, AsyncIterable):
+
+        async def items():
+            async for item in iterable:
+                yield convert(item)
+
+        data = items()
     else:
-        raise NotImplementedError(d.media_type)
+        data = map(convert, iterable)
+    return processor(dict(data=data, status=d.status))
 
-    return processor(
-        dict(
-            data=d.media_type_object.parse(raw),
-            status=d.status,
-        )
-    )
 
+class _ItemValidationError:
+    """The `z.ValidationError` of one item of a streamed body, located by index."""
 
-responseify = responseify_base
+    def __init__(self, index: int, error: z.ValidationError):
+        self.index = index
+        self.error = error
+
+    def format_errors(self):
+        return [
+            {**error, "loc": [self.index, *error.get("loc", [])]}
+            for error in self.error.format_errors()
+        ]
 
 
 class ParameterDecoratorBase(abc.ABC):
+    # set by async adapters, see `_get_invoker`
+    run_sync_handler: Callable | None = None
+
     def __init__(self, param: RequestParameterObject):
         self.param = param
 
     def __call__(self, func):
+        func = _get_invoker(func, self.run_sync_handler)
         set_oas_definition(func, self.param)
+        getattr(func, _OAS_OPERATION).add_input(self)
+        return func
+
+    @abc.abstractmethod
+    def validation_error_response(self, content: dict):
+        """The 422 response with the JSON `content`, see `validation_error_content`."""
+
+    def process_schema_parsing_exception(self, e: z.ValidationError):
+        return self.validation_error_response(
+            validation_error_content(e, self.param.location)
+        )
+
+    def request_header_fields_too_large(self):
+        """The 431 response to a header longer than its `max_length`."""
+        raise NotImplementedError
+
+    def process_schema_parsing_exceptions(
+        self, errors: list[tuple[ParameterDecoratorBase, z.ValidationError]]
+    ):
+        """
+        The response to parameters failing in several locations, one error per
+        location. The first location is reported as the error of the request.
+        """
+        (decorator, e), *others = errors
+        content = validation_error_content(
+            e,
+            decorator.param.location,
+            [(other.param.location, error) for other, error in others],
+        )
+        return decorator.validation_error_response(content)
+
+
+def validation_error_content(
+    e: z.ValidationError,
+    location: str,
+    others: list[tuple[str, z.ValidationError]] | None = None,
+) -> dict:
+    """
+    The JSON body of the 422 response to `e`, raised by the `location` of the
+    request, with the errors of the `others` locations failing at the same time.
+    """
+    content = {"in": location, "errors": e.format_errors()}
+    if getattr(e, "truncated", False):
+        content["truncated"] = True
+    if others:
+        content["others"] = [
+            {"in": other, "errors": error.format_errors()} for other, error in others
+        ]
+    return content
+
+
+class _ValidationErrors:
+    """Several `z.ValidationError` of one location reported as one."""
+
+    def __init__(self, errors: list[z.ValidationError]):
+        self.errors = errors
+
+    def format_errors(self):
+        return [error for e in self.errors for error in e.format_errors()]
 
-        def get_args(*args, **kwargs):
-            try:
-                extra = self.param.parse_request(*args, **kwargs)
-            except z.ValidationError as e:
-                throw(self.process_schema_parsing_exception(e))
-            args, kwargs = self.param.modify_args(*args, **kwargs)
-            return args, kwargs, extra
 
-        if iscoroutinefunction(func):
+class _ItemsValidationError(z.ValidationError):
+    """The errors of the items of an array, raised like those of its schema."""
 
-            @functools.wraps(func)
-            async def awrapper(res, *args, **kwargs):
-                args, kwargs, extra = get_args(*args, **kwargs)
-                return await func(res, *args, **kwargs, **extra)
+    def __init__(self, errors: _ValidationErrors | _CappedValidationError):
+        Exception.__init__(self, errors)
+        self.errors = errors
 
-            return awrapper
+    def format_errors(self):
+        return self.errors.format_errors()
+
+
+class _LimitError:
+    """A raw parameter value over its limits, reported like a `z.ValidationError`."""
+
+    def __init__(self, name: str | None, message: str):
+        self.name = name
+        self.message = message
+
+    def format_errors(self):
+        return [{"loc": [self.name] if self.name else [], "msgs": [self.message]}]
+
+
+def _check_limits(argumentset, limits, max_keys: int | None):
+    """The `_LimitError` of the first limit `argumentset` exceeds, if any."""
+    if max_keys is not None and len(argumentset) > max_keys:
+        return _LimitError(None, f"More than {max_keys} keys")
+    # every value of a repeated parameter counts, not only the one parsed
+    getlist = getattr(argumentset, "getlist", None)
+    for name, max_length, max_items in limits:
+        if getlist is not None:
+            values = getlist(name)
         else:
+            value = argumentset.get(name)
+            values = () if value is None else (value,)
+        if max_items is not None and len(values) > max_items:
+            return _LimitError(name, f"More than {max_items} values")
+        if max_length is not None:
+            for value in values:
+                # path values may already be converted by the router
+                if isinstance(value, str) and len(value) > max_length:
+                    return _LimitError(name, f"Longer than {max_length} characters")
+    return None
+
+
+class _QueryKeyLimit:
+    """
+    `max_query_keys` of an operation declaring no query parameter, checked on the
+    `query_argumentset` of the resource.
+    """
+
+    def bind(self, args: tuple, kwargs: dict, observation: _Observation | None = None):
+        resource = _cv_context.get().resource
+        if resource.max_query_keys is None:
+            return args, kwargs
+        argumentset = resource.query_argumentset(*args, **kwargs)
+        if argumentset is None:
+            return args, kwargs
+        error = _check_limits(argumentset, (), resource.max_query_keys)
+        if error is None:
+            return args, kwargs
+        return (
+            _ShortCircuit("invalid", ("query",)),
+            resource.validation_error_response(
+                validation_error_content(error, "query")
+            ),
+        )
 
-            @functools.wraps(func)
-            def wrapper(res, *args, **kwargs):
-                args, kwargs, extra = get_args(*args, **kwargs)
-                return func(res, *args, **kwargs, **extra)
 
-            return wrapper
+_QUERY_KEY_LIMIT = _QueryKeyLimit()
+
+
+class _CappedValidationError:
+    """
+    The first `max_errors` errors of a `z.ValidationError`, `truncated` when
+    some were left out.
+    """
+
+    def __init__(self, error, max_errors: int, truncated: bool = False):
+        errors = error.format_errors()
+        self.truncated = truncated or len(errors) > max_errors
+        self.errors = errors[:max_errors]
+
+    def format_errors(self):
+        return self.errors
+
+
+# The order the locations are checked in, cheapest first: the path is already
+# split by the router and the query, with the most keys, comes last. The first
+# failing location is reported as the error of the request.
+_LOCATION_PRIORITY = {"path": 0, "header": 1, "cookie": 2, "query": 3}
 
-    @abc.abstractmethod
-    def process_schema_parsing_exception(self, e: z.ValidationError): ...
+
+class _ParameterBatch:
+    """
+    All the parameters of an operation validated in a single pass, fetching the
+    argument set of each location once and reporting the errors of every
+    location together.
+    """
+
+    def __init__(self, decorators: list[ParameterDecoratorBase]):
+        self.decorators = decorators
+
+        locations: dict[type, list[ParameterDecoratorBase]] = {}
+        for decorator in decorators:
+            locations.setdefault(type(decorator.param), []).append(decorator)
+
+        # (decorator of the location, [(name to nest the argument set under, struct)],
+        # names of the parameters of the location, their limits)
+        self.locations: list[tuple[ParameterDecoratorBase, list, str, list]] = []
+        groups = sorted(
+            locations.values(),
+            key=lambda group: _LOCATION_PRIORITY.get(
+                group[0].param.location, len(_LOCATION_PRIORITY)
+            ),
+        )
+        for group in groups:
+            params = [decorator.param for decorator in group]
+            parsers: list[tuple[str | None, z.Schema]] = []
+            flat = [param for param in params if not param._nested]
+            if flat:
+                parsers.append((None, z.struct({p.name: p._field for p in flat})))
+            parsers.extend((p.name, p._struct) for p in params if p._nested)
+            names = ",".join(param.name for param in params)
+            limits = [
+                (p.name, p.max_length, p.max_items)
+                for p in params
+                if p.max_length is not None or p.max_items is not None
+            ]
+            self.locations.append((group[0], parsers, names, limits))
+
+    def bind(self, args: tuple, kwargs: dict, observation: _Observation | None = None):
+        extra = {}
+        errors = []
+        for decorator, parsers, names, limits in self.locations:
+            if observation is not None:
+                event = observation.start(
+                    "parameters", names, location=decorator.param.location
+                )
+            argumentset = decorator.param.get_argumentset(*args, **kwargs)
+            location = decorator.param.location
+            max_keys = None
+            if location == "query":
+                max_keys = _cv_context.get().resource.max_query_keys
+            if limits or max_keys is not None:
+                error = _check_limits(argumentset, limits, max_keys)
+                if error is not None:
+                    if observation is not None:
+                        observation.end(event)
+                    if location == "header":
+                        return (
+                            _HEADER_FIELDS_TOO_LARGE,
+                            decorator.request_header_fields_too_large(),
+                        )
+                    return (
+                        _ShortCircuit("invalid", (location,)),
+                        decorator.process_schema_parsing_exception(error),
+                    )
+            failed = []
+            for name, struct in parsers:
+                try:
+                    extra.update(
+                        struct.parse(
+                            argumentset if name is None else {name: argumentset}
+                        )
+                    )
+                except z.ValidationError as e:
+                    failed.append(e)
+            if observation is not None:
+                observation.end(event)
+            if failed:
+                errors.append(
+                    (
+                        decorator,
+                        failed[0] if len(failed) == 1 else _ValidationErrors(failed),
+                    )
+                )
+
+        if errors:
+            rejection = _ShortCircuit(
+                "invalid", tuple(decorator.param.location for decorator, _ in errors)
+            )
+            if len(errors) == 1:
+                decorator, e = errors[0]
+                return rejection, decorator.process_schema_parsing_exception(e)
+            return rejection, errors[0][0].process_schema_parsing_exceptions(errors)
+
+        for decorator in self.decorators:
+            args, kwargs = decorator.param.modify_args(*args, **kwargs)
+        kwargs.update(extra)
+        return args, kwargs
 
 
 class RequestBodyObject:
@@ -375,48 +1681,34 @@ def response(
     *,
     content: dict[str, MediaType] | None = None,
     description: str | None = None,
+    validation: str | None = None,
 ):
+    """
+    :param validation: The response validation mode of this response, defaults
+        to `response_validation` of the resource.
+    """
+    if validation is not None:
+        _check_response_validation_mode(validation)
+
     def decorator(func):
+        func = _get_invoker(func)
         set_oas_definition(func, ResponseObject(status, content, description))
-
-        local = (
+        getattr(func, _OAS_OPERATION).add_responses(
             [
-                ResponseDefinition(status, content_type, media_type)
+                ResponseDefinition(status, content_type, media_type, validation)
                 for content_type, media_type in content.items()
             ]
             if content
             else []
         )
-
-        @contextlib.contextmanager
-        def response_definitions_context():
-            token = response_definitions.set(local + response_definitions.get([]))
-            try:
-                yield
-            finally:
-                response_definitions.reset(token)
-
-        if iscoroutinefunction(func):
-
-            @functools.wraps(func)
-            async def awrapper(*args, **kwargs):
-                with response_definitions_context():
-                    return await func(*args, **kwargs)
-
-            return awrapper
-        else:
-
-            @functools.wraps(func)
-            def wrapper(*args, **kwargs):
-                with response_definitions_context():
-                    return func(*args, **kwargs)
-
-            return wrapper
+        return func
 
     return decorator
 
 
 class RequestBodyDecoratorBase(abc.ABC):
+    run_sync_handler: Callable | None = None
+
     def __init__(
         self,
         bind_to: str,
@@ -425,54 +1717,258 @@ class RequestBodyDecoratorBase(abc.ABC):
         content: dict[str, MediaType],
         description: str | None = None,
         required=True,
+        stream=False,
+        max_errors: int | None = None,
+        max_bytes: int | None = None,
     ):
+        """
+        :param stream: Bind an iterator over the items of the body instead of
+            the parsed body. The body is parsed incrementally while the handler
+            iterates, and each item is validated against the schema of the media
+            type. An async iterator is bound to async handlers.
+        :param max_errors: Report at most this many errors, 1 stops at the first
+            one. Defaults to `max_validation_errors` of the resource. A media
+            type with `items` stops validating once they are found.
+        :param max_bytes: Reject larger bodies with 413, by their Content-Length
+            before anything is read, and while reading when it is unknown or in
+            streaming mode.
+        """
+        if max_errors is not None and max_errors < 1:
+            raise ValueError("max_errors must be at least 1")
         self.request_body_object = RequestBodyObject(
             content=content, description=description, required=required
         )
         self.bind_to = bind_to
+        self.stream = stream
+        self.max_errors = max_errors
+        self.max_bytes = max_bytes
 
     def __call__(self, func):
+        func = _get_invoker(func, self.run_sync_handler)
         set_oas_definition(func, self.request_body_object)
+        getattr(func, _OAS_OPERATION).add_input(self)
+        return func
 
-        def get_media_type(*args, **kwargs):
-            meida_type = self.request_media_type(*args, **kwargs)
-            if meida_type not in self.request_body_object.content:
-                throw(self.unsupported_media_type())
-            return meida_type
+    def bind_data(
+        self,
+        media_type: str,
+        data,
+        args: tuple,
+        kwargs: dict,
+        observation: _Observation | None = None,
+    ):
+        if observation is not None:
+            event = observation.start("body_validation", media_type=media_type)
+        media_type_object = self.request_body_object.content[media_type]
+        max_errors = self.max_errors
+        if max_errors is None:
+            max_errors = _cv_context.get().resource.max_validation_errors
+        try:
+            if (
+                max_errors is not None
+                and media_type_object.items is not None
+                and isinstance(data, list)
+            ):
+                error = self.parse_items(media_type_object.items, data, max_errors)
+                if error is not None:
+                    return _INVALID_BODY, self.process_schema_parsing_exception(error)
+                kwargs[self.bind_to] = data
+            else:
+                kwargs[self.bind_to] = media_type_object.parse(data)
+        except z.ValidationError as e:
+            if max_errors is not None:
+                e = _CappedValidationError(e, max_errors)
+            return _INVALID_BODY, self.process_schema_parsing_exception(e)
+        finally:
+            if observation is not None:
+                observation.end(event)
+        return args, kwargs
 
-        def parse_data(media_type: str, data):
+    @staticmethod
+    def parse_items(schema: z.Schema, data: list, max_errors: int):
+        """
+        Parses the items of `data` in place, stopping at the `max_errors`th
+        invalid one, and returns the errors if any.
+        """
+        errors = []
+        for index, item in enumerate(data):
             try:
-                value = self.request_body_object.content[media_type].parse(data)
+                data[index] = schema.parse(item)
             except z.ValidationError as e:
-                throw(self.process_schema_parsing_exception(e))
-            return value
-
-        if iscoroutinefunction(func):
-
-            @functools.wraps(func)
-            async def awrapper(res, *args, **kwargs):
-                media_type = get_media_type(*args, **kwargs)
-                processor = self.get_processor(media_type)
-                processor_args = self.get_processor_args(*args, **kwargs)
-                data = await processor(*processor_args)
-                value = parse_data(media_type, data)
-                return await func(res, *args, **kwargs, **{self.bind_to: value})
-
-            return awrapper
-        else:
-
-            @functools.wraps(func)
-            def wrapper(res, *args, **kwargs):
-                media_type = get_media_type(*args, **kwargs)
-                processor = self.get_processor(media_type)
-                processor_args = self.get_processor_args(*args, **kwargs)
-                data = processor(*processor_args)
-                if self.is_response(data):
-                    return data
-                value = parse_data(media_type, data)
-                return func(res, *args, **kwargs, **{self.bind_to: value})
-
-            return wrapper
+                errors.append(_ItemValidationError(index, e))
+                if len(errors) == max_errors:
+                    return _CappedValidationError(
+                        _ValidationErrors(errors),
+                        max_errors,
+                        truncated=index < len(data) - 1,
+                    )
+        if errors:
+            return _ValidationErrors(errors)
+        return None
+
+    # A streamed body is validated while the handler iterates over it, so its
+    # errors can only be raised, as a `ThrowValue` which tells the metrics why.
+
+    def decode_chunk(self, decoder, chunk: bytes | None):
+        try:
+            return decoder.close() if chunk is None else decoder.feed(chunk)
+        except ValueError:
+            raise ThrowValue(self.invalid_body("Invalid JSON"), _INVALID_BODY)
+
+    def parse_item(self, media_type: str, index: int, value):
+        try:
+            return self.request_body_object.content[media_type].parse(value)
+        except z.ValidationError as e:
+            raise ThrowValue(
+                self.process_schema_parsing_exception(_ItemValidationError(index, e)),
+                _INVALID_BODY,
+            )
+
+    def get_stream_decoder(self, media_type: str):
+        try:
+            factory = STREAM_DECODERS[media_type]
+        except KeyError:
+            raise NotImplementedError(media_type) from None
+        return factory((current_json_codec() or get_json_codec("json")).loads)
+
+    def limit_chunks(self, chunks: Iterable[bytes]):
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise ThrowValue(self.payload_too_large(), _PAYLOAD_TOO_LARGE)
+            yield chunk
+
+    async def alimit_chunks(self, chunks: AsyncIterable[bytes]):
+        size = 0
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise ThrowValue(self.payload_too_large(), _PAYLOAD_TOO_LARGE)
+            yield chunk
+
+    def iter_items(self, media_type: str, chunks: Iterable[bytes]):
+        decoder = self.get_stream_decoder(media_type)
+        index = 0
+        for chunk in itertools.chain(chunks, [None]):
+            for value in self.decode_chunk(decoder, chunk):
+                yield self.parse_item(media_type, index, value)
+                index += 1
+
+    async def aiter_items(self, media_type: str, chunks: AsyncIterable[bytes]):
+        decoder = self.get_stream_decoder(media_type)
+        index = 0
+        async for chunk in chunks:
+            for value in self.decode_chunk(decoder, chunk):
+                yield self.parse_item(media_type, index, value)
+                index += 1
+        for value in self.decode_chunk(decoder, None):
+            yield self.parse_item(media_type, index, value)
+            index += 1
+
+    def bind(self, args: tuple, kwargs: dict, observation: _Observation | None = None):
+        media_type = self.request_media_type(*args, **kwargs)
+        if media_type not in self.request_body_object.content:
+            return _UNSUPPORTED_MEDIA_TYPE, self.unsupported_media_type()
+        length = None
+        if self.max_bytes is not None:
+            length = self.content_length(*args, **kwargs)
+            if length is not None and length > self.max_bytes:
+                return _PAYLOAD_TOO_LARGE, self.payload_too_large()
+        if self.stream:
+            chunks = self.request_stream(*args, **kwargs)
+            if self.max_bytes is not None:
+                chunks = self.limit_chunks(chunks)
+            kwargs[self.bind_to] = self.iter_items(media_type, chunks)
+            return args, kwargs
+        if self.max_bytes is not None and length is None:
+            # A body of unknown length, such as a chunked upload, is read up to
+            # `max_bytes` before its processor reads it whole.
+            try:
+                body = b"".join(self.limit_chunks(self.request_stream(*args, **kwargs)))
+            except ThrowValue as e:
+                return _PAYLOAD_TOO_LARGE, e.value
+            self.buffer_body(body, *args, **kwargs)
+        processor = self.get_processor(media_type)
+        if observation is not None:
+            event = observation.start("body_decoding", media_type=media_type)
+        data = processor(*self.get_processor_args(*args, **kwargs))
+        if observation is not None:
+            observation.end(event)
+        if self.is_response(data):
+            return _PROCESSOR_RESPONSE, data
+        return self.bind_data(media_type, data, args, kwargs, observation)
+
+    async def abind(
+        self, args: tuple, kwargs: dict, observation: _Observation | None = None
+    ):
+        media_type = self.request_media_type(*args, **kwargs)
+        if media_type not in self.request_body_object.content:
+            return _UNSUPPORTED_MEDIA_TYPE, self.unsupported_media_type()
+        length = None
+        if self.max_bytes is not None:
+            length = self.content_length(*args, **kwargs)
+            if length is not None and length > self.max_bytes:
+                return _PAYLOAD_TOO_LARGE, self.payload_too_large()
+        if self.stream:
+            chunks = self.request_stream(*args, **kwargs)
+            if not hasattr(chunks, "__aiter__"):
+                chunks = _aiter(chunks)
+            if self.max_bytes is not None:
+                chunks = self.alimit_chunks(chunks)
+            kwargs[self.bind_to] = self.aiter_items(media_type, chunks)
+            return args, kwargs
+        if self.max_bytes is not None and length is None:
+            chunks = self.request_stream(*args, **kwargs)
+            if not hasattr(chunks, "__aiter__"):
+                chunks = _aiter(chunks)
+            try:
+                body = b"".join([chunk async for chunk in self.alimit_chunks(chunks)])
+            except ThrowValue as e:
+                return _PAYLOAD_TOO_LARGE, e.value
+            self.buffer_body(body, *args, **kwargs)
+        processor = self.get_processor(media_type)
+        if observation is not None:
+            event = observation.start("body_decoding", media_type=media_type)
+        # the processors of sync frameworks serve their async handlers as well
+        data = processor(*self.get_processor_args(*args, **kwargs))
+        if inspect.isawaitable(data):
+            data = await data
+        if observation is not None:
+            observation.end(event)
+        if self.is_response(data):
+            return _PROCESSOR_RESPONSE, data
+        return await self.abind_data(media_type, data, args, kwargs, observation)
+
+    async def abind_data(
+        self,
+        media_type: str,
+        data,
+        args: tuple,
+        kwargs: dict,
+        observation: _Observation | None = None,
+    ):
+        """
+        `bind_data` for async handlers, adapters may run it elsewhere. The items
+        of a media type with `chunk_size` are parsed by chunks.
+        """
+        media_type_object = self.request_body_object.content[media_type]
+        if media_type_object.chunk_size is None or not isinstance(data, list):
+            return self.bind_data(media_type, data, args, kwargs, observation)
+        if observation is not None:
+            event = observation.start("body_validation", media_type=media_type)
+        max_errors = self.max_errors
+        if max_errors is None:
+            max_errors = _cv_context.get().resource.max_validation_errors
+        try:
+            value, errors = await media_type_object.aparse_items(data, max_errors)
+            if errors is not None:
+                return _INVALID_BODY, self.process_schema_parsing_exception(errors)
+            kwargs[self.bind_to] = value
+            return args, kwargs
+        finally:
+            if observation is not None:
+                observation.end(event)
 
     def get_processor_args(self, *args, **kwargs) -> tuple:
         return tuple()
@@ -486,20 +1982,51 @@ class RequestBodyDecoratorBase(abc.ABC):
     def is_response(self, response):
         raise NotImplementedError
 
+    def request_stream(self, *args, **kwargs) -> Iterable[bytes] | AsyncIterable[bytes]:
+        """The raw body in chunks, for streaming mode."""
+        raise NotImplementedError
+
+    def invalid_body(self, message: str):
+        raise NotImplementedError
+
+    def content_length(self, *args, **kwargs) -> int | None:
+        """The Content-Length of the request, `None` when unknown."""
+        raise NotImplementedError
+
+    def buffer_body(self, body: bytes, *args, **kwargs):
+        """
+        Makes the request processors read `body`, the whole body already read
+        from `request_stream` to check `max_bytes`.
+        """
+        raise NotImplementedError
+
+    def payload_too_large(self):
+        raise NotImplementedError
+
     def get_processor(self, media_type: str):
-        for res in inspect.getmro(_cv_resource.get()):
-            if issubclass(res, ResourceBase):
-                if media_type in res.request_content_processors:
-                    return res.request_content_processors[media_type]
-        raise NotImplementedError(media_type)
+        try:
+            return _cv_context.get().resource._request_processors[media_type]
+        except KeyError:
+            raise NotImplementedError(media_type) from None
 
     @abc.abstractmethod
-    def process_schema_parsing_exception(self, e: z.ValidationError): ...
+    def validation_error_response(self, content: dict):
+        """The 422 response with the JSON `content`, see `validation_error_content`."""
+
+    def process_schema_parsing_exception(self, e: z.ValidationError):
+        return self.validation_error_response(validation_error_content(e, "body"))
+
+
+async def _aiter(iterable: Iterable):
+    for item in iterable:
+        yield item
 
 
 class ThrowValue(Exception):
-    def __init__(self, value):
+    def __init__(self, value, rejection: _ShortCircuit | None = None):
         self.value = value
+        # why an input stage answered the request, for the metrics
+        self.rejection = rejection
 
 
 def throw(value, /):
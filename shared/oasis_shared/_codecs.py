@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from collections.abc import AsyncIterable, Callable, Iterable
+from typing import Any, NamedTuple
+
+from ._context import _cv_context
+
+
+class JSONCodec(NamedTuple):
+    dumps: Callable[[Any], bytes]
+    # must raise `ValueError` for invalid JSON
+    loads: Callable[[bytes | str], Any]
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _stdlib_codec():
+    return JSONCodec(_dumps, json.loads)
+
+
+def _orjson_codec():
+    import orjson
+
+    return JSONCodec(orjson.dumps, orjson.loads)
+
+
+def _msgspec_codec():
+    import msgspec
+
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+
+    def loads(data):
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    return JSONCodec(encoder.encode, loads)
+
+
+def _ujson_codec():
+    import ujson
+
+    return JSONCodec(
+        lambda value: ujson.dumps(value, ensure_ascii=False).encode(), ujson.loads
+    )
+
+
+JSON_CODECS: dict[str, Callable[[], JSONCodec]] = {
+    "json": _stdlib_codec,
+    "orjson": _orjson_codec,
+    "msgspec": _msgspec_codec,
+    "ujson": _ujson_codec,
+}
+
+_json_codecs: dict[str, JSONCodec] = {}
+
+
+def get_json_codec(name: str) -> JSONCodec:
+    """
+    The JSON codec called `name` in `JSON_CODECS`, or with "auto", the first
+    one installed of orjson, msgspec and ujson, falling back to the stdlib.
+    """
+    try:
+        return _json_codecs[name]
+    except KeyError:
+        pass
+    if name == "auto":
+        for candidate in ("orjson", "msgspec", "ujson", "json"):
+            try:
+                codec = get_json_codec(candidate)
+            except ImportError:
+                continue
+            break
+    else:
+        codec = JSON_CODECS[name]()
+    _json_codecs[name] = codec
+    return codec
+
+
+def current_json_codec() -> JSONCodec | None:
+    """
+    The JSON codec selected by `json_codec` of the current resource, `None`
+    when the framework's own JSON handling is used.
+    """
+    ctx = _cv_context.get(None)
+    if ctx is None or ctx.resource.json_codec is None:
+        return None
+    return get_json_codec(ctx.resource.json_codec)
+
+
+STREAM_FORMATS: dict[str, tuple[bytes, bytes]] = {
+    "application/x-ndjson": (b"", b"\n"),
+    # RFC 7464
+    "application/json-seq": (b"\x1e", b"\n"),
+    "text/event-stream": (b"data: ", b"\n\n"),
+}
+
+
+def encode_stream(items: Iterable | AsyncIterable, media_type: str):
+    """Lazily encode the items of a streaming response to chunks of bytes."""
+    prefix, suffix = STREAM_FORMATS[media_type]
+    dumps = (current_json_codec() or get_json_codec("json")).dumps
+
+    def encode(item):
+        return prefix + dumps(item) + suffix
+
+    if isinstance(items, AsyncIterable):
+
+        async def chunks():
+            async for item in items:
+                yield encode(item)
+
+        return chunks()
+    return map(encode, items)
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class _RecordsDecoder:
+    """Push parser for JSON values separated by `separator`, NDJSON and RFC 7464."""
+
+    def __init__(self, separator: bytes, loads: Callable[[bytes], Any]):
+        self.__separator = separator
+        self.__loads = loads
+        self.__pending: list[bytes] = []
+
+    def feed(self, chunk: bytes) -> list:
+        if self.__separator not in chunk:
+            self.__pending.append(chunk)
+            return []
+        self.__pending.append(chunk)
+        *records, tail = b"".join(self.__pending).split(self.__separator)
+        self.__pending = [tail]
+        return [self.__loads(record) for record in records if record.strip()]
+
+    def close(self) -> list:
+        record = b"".join(self.__pending)
+        self.__pending = []
+        return [self.__loads(record)] if record.strip() else []
+
+
+class _JSONArrayDecoder:
+    """Push parser for the items of a top-level JSON array."""
+
+    _decoder = json.JSONDecoder()
+    # what may follow the position of a decoding error when the item is only
+    # cut by the end of the chunk: part of a number or of a literal
+    _partial_number = re.compile(r"[0-9.eE+-]*")
+    _partial_literals = frozenset(
+        literal[:end]
+        for literal in ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+        for end in range(1, len(literal))
+    )
+
+    def __init__(self):
+        self.__text = codecs.getincrementaldecoder("utf-8")()
+        self.__chunks: list[str] = []
+        self.__size = 0
+        # the unparsed text is parsed again once it has doubled, so that an
+        # item spread over many chunks is not parsed again for each of them
+        self.__wanted = 0
+        self.__state = "start"  # start -> item -> next -> ... -> end
+
+    @classmethod
+    def __truncated(cls, buffer: str, e: json.JSONDecodeError):
+        rest = buffer[e.pos :]
+        if e.msg.startswith("Unterminated string"):
+            return True
+        if e.msg.startswith("Invalid \\uXXXX escape"):
+            return len(rest) <= 5
+        return (
+            rest in cls._partial_literals
+            or cls._partial_number.fullmatch(rest) is not None
+        )
+
+    def __parse(self, closed: bool) -> list:
+        rv = []
+        buffer = "".join(self.__chunks)
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\n\r":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if self.__state == "start":
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                self.__state = "first"
+                pos += 1
+            elif self.__state in ("first", "item"):
+                if self.__state == "first" and buffer[pos] == "]":
+                    self.__state = "end"
+                    pos += 1
+                    continue
+                try:
+                    value, end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    if closed or not self.__truncated(buffer, e):
+                        raise
+                    break
+                # a number may be cut in half by the end of the chunk
+                if not closed and (
+                    end == len(buffer) or buffer[end] not in ",] \t\n\r"
+                ):
+                    break
+                rv.append(value)
+                self.__state = "next"
+                pos = end
+            elif self.__state == "next":
+                if buffer[pos] == ",":
+                    self.__state = "item"
+                elif buffer[pos] == "]":
+                    self.__state = "end"
+                else:
+                    raise ValueError("Expected ',' or ']'")
+                pos += 1
+            else:
+                raise ValueError("Extra data after the JSON array")
+        buffer = buffer[pos:]
+        self.__chunks = [buffer] if buffer else []
+        self.__size = len(buffer)
+        self.__wanted = 2 * len(buffer)
+        return rv
+
+    def __append(self, text: str):
+        if text:
+            self.__chunks.append(text)
+            self.__size += len(text)
+
+    def feed(self, chunk: bytes) -> list:
+        self.__append(self.__text.decode(chunk))
+        if self.__size < self.__wanted:
+            return []
+        return self.__parse(closed=False)
+
+    def close(self) -> list:
+        self.__append(self.__text.decode(b"", final=True))
+        rv = self.__parse(closed=True)
+        if self.__state != "end":
+            raise ValueError("Unterminated JSON array")
+        return rv
+
+
+# factories taking the `loads` of the JSON codec in use
+STREAM_DECODERS: dict[str, Callable[[Callable], Any]] = {
+    "application/x-ndjson": lambda loads: _RecordsDecoder(b"\n", loads),
+    "application/json-seq": lambda loads: _RecordsDecoder(b"\x1e", loads),
+    "application/json": lambda loads: _JSONArrayDecoder(),
+}
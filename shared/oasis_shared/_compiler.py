@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import functools
+import inspect
+from collections.abc import Callable
+from typing import Any
+
+
+def _get_schema_spec(schema, openapi: str):
+    if tuple(map(int, openapi.split(".")))[:2] == (3, 0):
+        from zangar.compilation import OpenAPI30Compiler
+
+        return OpenAPI30Compiler().compile(schema)
+    raise NotImplementedError(f"Unsupported openapi: {openapi}")
+
+
+_FALLBACK = object()
+
+# Keywords which change neither what a schema accepts nor what it returns.
+_ANNOTATION_KEYWORDS = frozenset(
+    ["title", "description", "example", "deprecated", "default", "readOnly"]
+)
+_SCALAR_TYPES = {
+    "integer": "int",
+    "number": "float",
+    "string": "str",
+    "boolean": "bool",
+}
+_NUMBER_FORMATS = frozenset(["int32", "int64", "float", "double"])
+_BOUNDS = (
+    ("minimum", "exclusiveMinimum", "{}", "<"),
+    ("maximum", "exclusiveMaximum", "{}", ">"),
+    ("minLength", None, "len({})", "<"),
+    ("maxLength", None, "len({})", ">"),
+    ("minItems", None, "len({})", "<"),
+    ("maxItems", None, "len({})", ">"),
+)
+
+
+def _is_zangar(value) -> bool:
+    return (getattr(value, "__module__", None) or "").partition(".")[0] == "zangar"
+
+
+def _holds_foreign_callables(value, seen: set[int]) -> bool:
+    """
+    Whether the object graph of a zangar schema holds a callable that does not
+    come from zangar: a transformation, a custom check, a dataclass, ...
+    Unknown objects count as such callables, builtin types don't.
+    """
+    if value is None or isinstance(value, (str, bytes, int, float, bool)):
+        return False
+    if id(value) in seen:
+        return False
+    seen.add(id(value))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return any(_holds_foreign_callables(item, seen) for item in value)
+    if isinstance(value, dict):
+        return any(
+            _holds_foreign_callables(k, seen) or _holds_foreign_callables(v, seen)
+            for k, v in value.items()
+        )
+    if isinstance(value, functools.partial):
+        return _holds_foreign_callables((value.func, value.args, value.keywords), seen)
+    if inspect.ismethod(value):
+        return _holds_foreign_callables((value.__func__, value.__self__), seen)
+    if inspect.isfunction(value):
+        # zangar's own functions may close over the callables given to it
+        return not _is_zangar(value) or _holds_foreign_callables(
+            (
+                [cell.cell_contents for cell in value.__closure__ or ()],
+                value.__defaults__,
+                value.__kwdefaults__,
+            ),
+            seen,
+        )
+    if isinstance(value, type):
+        # the builtin types are those zangar checks values against
+        return not (_is_zangar(value) or value.__module__ == "builtins")
+    if callable(value) and not hasattr(value, "__dict__"):
+        return not _is_zangar(value)
+    if not _is_zangar(type(value)):
+        return True
+    attributes = list(getattr(value, "__dict__", {}).values())
+    for cls in type(value).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        for slot in [slots] if isinstance(slots, str) else slots:
+            if slot not in ("__dict__", "__weakref__") and hasattr(value, slot):
+                attributes.append(getattr(value, slot))
+    return _holds_foreign_callables(attributes, seen)
+
+
+class _Uncompilable(Exception):
+    pass
+
+
+class _SchemaCompiler:
+    """
+    Generates the source of a `parse(value)` function from an OpenAPI 3.0
+    Schema Object.
+
+    The function only handles values that are already what the schema returns:
+    values of the exact type within their bounds, objects with all of their
+    properties and nothing else, arrays of such values. It returns a copy of
+    them, and `_FALLBACK` for everything else, so that coercions, defaults and
+    errors are all left to the schema itself.
+    """
+
+    def __init__(self):
+        self.lines: list[str] = []
+        self.count = 0
+
+    def compile(self, spec: dict) -> str:
+        self.emit(0, "def parse(v0):")
+        self.emit(1, f"return {self.node(spec, 'v0', 1)}")
+        return "\n".join(self.lines)
+
+    def emit(self, indent: int, line: str):
+        self.lines.append("    " * indent + line)
+
+    def fallback_if(self, indent: int, condition: str):
+        self.emit(indent, f"if {condition}:")
+        self.emit(indent + 1, "return _FALLBACK")
+
+    def name(self):
+        self.count += 1
+        return f"v{self.count}"
+
+    def node(self, spec: dict, src: str, indent: int) -> str:
+        """Emits the checks of `src`, returns the expression of its result."""
+        if not spec.get("nullable"):
+            return self.typed(spec, src, indent)
+        dst = self.name()
+        self.emit(indent, f"if {src} is None:")
+        self.emit(indent + 1, f"{dst} = None")
+        self.emit(indent, "else:")
+        self.emit(indent + 1, f"{dst} = {self.typed(spec, src, indent + 1)}")
+        return dst
+
+    def typed(self, spec: dict, src: str, indent: int) -> str:
+        kind = spec.get("type")
+        keywords = set(spec) - _ANNOTATION_KEYWORDS - {"type", "nullable", "enum"}
+        keywords -= {keyword for keyword, *_ in _BOUNDS}
+        if kind in ("integer", "number") and spec.get("format") in _NUMBER_FORMATS:
+            keywords.discard("format")
+        if kind == "array" and "items" in spec:
+            keywords.discard("items")
+        elif kind == "object" and spec.get("properties"):
+            keywords -= {"properties", "required", "additionalProperties"}
+        elif kind not in _SCALAR_TYPES:
+            raise _Uncompilable(spec)
+        if keywords - {"exclusiveMinimum", "exclusiveMaximum"}:
+            raise _Uncompilable(spec)
+
+        pytype = _SCALAR_TYPES.get(kind, "list" if kind == "array" else "dict")
+        self.fallback_if(indent, f"type({src}) is not {pytype}")
+        for keyword, exclusive, subject, op in _BOUNDS:
+            if keyword in spec:
+                if exclusive and spec.get(exclusive):
+                    op += "="
+                self.fallback_if(
+                    indent, f"{subject.format(src)} {op} {spec[keyword]!r}"
+                )
+        if "enum" in spec:
+            self.fallback_if(indent, f"{src} not in {tuple(spec['enum'])!r}")
+
+        if kind == "array":
+            dst, item = self.name(), self.name()
+            self.emit(indent, f"{dst} = []")
+            self.emit(indent, f"for {item} in {src}:")
+            value = self.node(spec["items"], item, indent + 1)
+            self.emit(indent + 1, f"{dst}.append({value})")
+            return dst
+        if kind == "object":
+            properties = spec["properties"]
+            self.fallback_if(indent, f"len({src}) != {len(properties)}")
+            fields = []
+            for key, property_spec in properties.items():
+                value = self.name()
+                self.emit(indent, f"{value} = {src}.get({key!r}, _FALLBACK)")
+                self.fallback_if(indent, f"{value} is _FALLBACK")
+                fields.append(f"{key!r}: {self.node(property_spec, value, indent)}")
+            dst = self.name()
+            self.emit(indent, f"{dst} = {{{', '.join(fields)}}}")
+            return dst
+        return src
+
+
+def _compile_schema(schema) -> Callable[[Any], Any] | None:
+    """
+    Returns the generated parse function of `schema`, with its source as
+    `__source__`, or None if the schema uses anything it can't express.
+    """
+    try:
+        source = _SchemaCompiler().compile(_get_schema_spec(schema, "3.0.3"))
+    except _Uncompilable:
+        return None
+    namespace = {"_FALLBACK": _FALLBACK}
+    exec(compile(source, "<oasis compiled schema>", "exec"), namespace)
+    func = namespace["parse"]
+    func.__source__ = source
+    return func
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import contextlib
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from . import ResourceBase, _Observation, _ResponseIndex
+
+
+class RequestContext:
+    """
+    The state oasis keeps for the request being handled, see `current_context`.
+
+    `parameters` are the validated inputs passed to the handler, keyed by the
+    name they are bound to, `responses` the response definitions in effect and
+    `observation` the timing of the request when the resource has a
+    `stage_observer` or `metrics`.
+    """
+
+    __slots__ = ("resource", "request", "parameters", "responses", "observation")
+
+    def __init__(self, resource: type[ResourceBase], request=None):
+        self.resource = resource
+        self.request = request
+        self.parameters: dict[str, Any] = {}
+        self.responses: _ResponseIndex | None = None
+        self.observation: _Observation | None = None
+
+
+_cv_context: ContextVar[RequestContext] = ContextVar("oasis_request_context")
+
+
+def current_context() -> RequestContext:
+    """The context of the request being handled, `LookupError` outside of one."""
+    return _cv_context.get()
+
+
+@contextlib.contextmanager
+def resource_ctx(resource: type[ResourceBase], request=None):
+    """Handles a request with a new `RequestContext`, once per request."""
+    token = _cv_context.set(RequestContext(resource, request))
+    try:
+        yield
+    finally:
+        _cv_context.reset(token)
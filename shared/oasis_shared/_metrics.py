@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import bisect
+import itertools
+import threading
+import weakref
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from . import ResourceBase, _ShortCircuit
+
+
+class _MetricsShard:
+    __slots__ = ("counters", "histograms", "__weakref__")
+
+    def __init__(self):
+        # (name, resource, method, location) -> count
+        self.counters: dict[tuple[str, str, str, str], int] = {}
+        # (resource, method) -> [count per bucket..., count above, sum]
+        self.histograms: dict[tuple[str, str], list] = {}
+
+
+class MetricsSnapshot(NamedTuple):
+    # (name, resource, method, location) -> count, location is "" when unused
+    counters: dict[tuple[str, str, str, str], int]
+    # (resource, method) -> ([(upper bound, cumulative count)...], sum, count)
+    histograms: dict[tuple[str, str], tuple[list[tuple[float, int]], float, int]]
+
+
+class Metrics:
+    """
+    Request counters and latency histograms per resource and method, set it as
+    `metrics` of a resource.
+
+    Counters: "requests", "unsupported_media_type", "validation_failures" (per
+    location, "body" for the request body), "response_validation_failures" and
+    "shadow_validation_dropped".
+    Each thread counts into its own shard, so recording takes no lock under
+    threaded workers and costs nothing to share on an event loop; `snapshot`
+    merges the shards. The shard of a thread that ends is folded into the
+    counts of the ended threads, so thread-per-connection servers don't
+    accumulate them.
+    """
+
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, buckets: tuple[float, ...] | None = None):
+        self.buckets = tuple(sorted(buckets or self.BUCKETS))
+        self._local = threading.local()
+        # only referenced by their thread, see `_retire`
+        self._shards: weakref.WeakSet[_MetricsShard] = weakref.WeakSet()
+        self._retired = _MetricsShard()
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> _MetricsShard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _MetricsShard()
+            with self._shards_lock:
+                self._shards.add(shard)
+            weakref.finalize(shard, self._retire, shard.counters, shard.histograms)
+            return shard
+
+    def _retire(self, counters: dict, histograms: dict):
+        """Folds the counts of the shard of an ended thread into `_retired`."""
+        with self._shards_lock:
+            _merge_counts(
+                self._retired.counters, self._retired.histograms, counters, histograms
+            )
+
+    def _count(self, shard, name: str, resource: str, method: str, location=""):
+        key = (name, resource, method, location)
+        shard.counters[key] = shard.counters.get(key, 0) + 1
+
+    def record(
+        self,
+        resource: type[ResourceBase],
+        method: str,
+        duration: float,
+        rejection: _ShortCircuit | None = None,
+    ):
+        shard = self._shard()
+        name = resource.__qualname__
+        self._count(shard, "requests", name, method)
+        if rejection is not None:
+            if rejection.reason == "unsupported_media_type":
+                self._count(shard, "unsupported_media_type", name, method)
+            elif rejection.reason == "invalid":
+                for location in rejection.locations:
+                    self._count(shard, "validation_failures", name, method, location)
+        histogram = shard.histograms.get((name, method))
+        if histogram is None:
+            histogram = shard.histograms[(name, method)] = [0] * (
+                len(self.buckets) + 1
+            ) + [0.0]
+        histogram[bisect.bisect_left(self.buckets, duration)] += 1
+        histogram[-1] += duration
+
+    def record_response_validation_failure(
+        self, resource: type[ResourceBase], method: str
+    ):
+        self._count(
+            self._shard(), "response_validation_failures", resource.__qualname__, method
+        )
+
+    def record_shadow_validation_dropped(
+        self, resource: type[ResourceBase], method: str, count: int = 1
+    ):
+        shard = self._shard()
+        key = ("shadow_validation_dropped", resource.__qualname__, method, "")
+        shard.counters[key] = shard.counters.get(key, 0) + count
+
+    def snapshot(self) -> MetricsSnapshot:
+        counters: dict[tuple[str, str, str, str], int] = {}
+        histograms: dict[tuple[str, str], list] = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+            _merge_counts(
+                counters, histograms, self._retired.counters, self._retired.histograms
+            )
+        for shard in shards:
+            _merge_counts(counters, histograms, shard.counters, shard.histograms)
+        rv = {}
+        for key, histogram in histograms.items():
+            cumulative = list(itertools.accumulate(histogram[:-1]))
+            rv[key] = (
+                list(zip((*self.buckets, float("inf")), cumulative)),
+                histogram[-1],
+                cumulative[-1],
+            )
+        return MetricsSnapshot(counters, rv)
+
+    def prometheus(self) -> str:
+        """The snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, help in _PROMETHEUS_COUNTERS.items():
+            samples = [
+                (key, value)
+                for key, value in snapshot.counters.items()
+                if key[0] == name
+            ]
+            if not samples:
+                continue
+            lines.append(f"# HELP oasis_{name}_total {help}")
+            lines.append(f"# TYPE oasis_{name}_total counter")
+            for (_, resource, method, location), value in sorted(samples):
+                labels = _prometheus_labels(resource, method, location=location)
+                lines.append(f"oasis_{name}_total{{{labels}}} {value}")
+        if snapshot.histograms:
+            metric = "oasis_request_duration_seconds"
+            lines.append(f"# HELP {metric} Time spent in oasis operations.")
+            lines.append(f"# TYPE {metric} histogram")
+            for (resource, method), (buckets, total, count) in sorted(
+                snapshot.histograms.items()
+            ):
+                for le, value in buckets:
+                    labels = _prometheus_labels(
+                        resource, method, le="+Inf" if le == float("inf") else repr(le)
+                    )
+                    lines.append(f"{metric}_bucket{{{labels}}} {value}")
+                labels = _prometheus_labels(resource, method)
+                lines.append(f"{metric}_sum{{{labels}}} {total!r}")
+                lines.append(f"{metric}_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge_counts(
+    counters: dict, histograms: dict, others: dict, other_histograms: dict
+):
+    # copying a dict or a list is atomic, the shard may be written meanwhile
+    for key, value in dict(others).items():
+        counters[key] = counters.get(key, 0) + value
+    for key, histogram in dict(other_histograms).items():
+        histogram = list(histogram)
+        merged = histograms.get(key)
+        if merged is None:
+            histograms[key] = histogram
+        else:
+            histograms[key] = [a + b for a, b in zip(merged, histogram)]
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_PROMETHEUS_COUNTERS = {
+    "requests": "Requests handled by oasis operations.",
+    "unsupported_media_type": "Requests rejected with 415 Unsupported Media Type.",
+    "validation_failures": "Requests rejected with 422, per failing location.",
+    "response_validation_failures": "Responses that failed validation.",
+    "shadow_validation_dropped": "Responses left unchecked by a full shadow queue.",
+}
+
+
+def _prometheus_labels(resource: str, method: str, **extra: str):
+    labels = {"resource": resource, "method": method, **extra}
+    return ",".join(
+        '%s="%s"'
+        % (
+            key,
+            value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for key, value in labels.items()
+        if value
+    )
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import abc
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from . import ResourceBase
+
+
+STAGES = (
+    "parameters",
+    "body_decoding",
+    "body_validation",
+    "handler",
+    "response_validation",
+    "serialization",
+)
+
+
+class StageEvent:
+    """
+    One stage of a request, see `STAGES`. `name` is the names of the parameters
+    of a "parameters" stage, `location` their location, and `media_type` is set
+    for the body and response stages.
+    """
+
+    __slots__ = (
+        "stage",
+        "resource",
+        "method",
+        "name",
+        "location",
+        "media_type",
+        "start",
+        "end",
+    )
+
+    def __init__(
+        self,
+        stage: str,
+        resource: type[ResourceBase],
+        method: str,
+        name: str | None = None,
+        location: str | None = None,
+        media_type: str | None = None,
+    ):
+        self.stage = stage
+        self.resource = resource
+        self.method = method
+        self.name = name
+        self.location = location
+        self.media_type = media_type
+        self.start: float = 0.0
+        self.end: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        """In seconds."""
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"<StageEvent {self.resource.__qualname__}.{self.method} {self.stage}>"
+
+
+class StageObserver:
+    """
+    Receives the stages of requests, set it as `stage_observer` of a resource.
+
+    The response stages run inside the handler, so "handler" includes them.
+    Stacked operations, as with a decorated `dispatch`, make one request whose
+    "handler" is that of the outermost operation, and whose `method` is the
+    HTTP method of the request.
+    """
+
+    def stage_start(self, event: StageEvent) -> None: ...
+
+    def stage_end(self, event: StageEvent) -> None: ...
+
+    def request_end(self, events: list[StageEvent], response):
+        """Called with the ended stages of a request, returns the response."""
+        return response
+
+
+class StageCollector(StageObserver):
+    """Keeps the last `maxlen` ended stages in memory."""
+
+    def __init__(self, maxlen: int = 10000):
+        self.events: deque[StageEvent] = deque(maxlen=maxlen)
+
+    def stage_end(self, event: StageEvent) -> None:
+        self.events.append(event)
+
+    def summary(self) -> dict[tuple[str, str, str], tuple[int, float]]:
+        """(resource, method, stage) -> (count, total seconds)"""
+        rv: dict[tuple[str, str, str], tuple[int, float]] = {}
+        for event in list(self.events):
+            key = (event.resource.__qualname__, event.method, event.stage)
+            count, total = rv.get(key, (0, 0.0))
+            rv[key] = (count + 1, total + event.duration)
+        return rv
+
+    def clear(self):
+        self.events.clear()
+
+
+class ServerTimingBase(StageObserver, abc.ABC):
+    """
+    Reports the stages of each request in a `Server-Timing` header, which the
+    developer tools of browsers display. Meant for development.
+    """
+
+    def request_end(self, events: list[StageEvent], response):
+        return self.set_header(response, "Server-Timing", self.header(events))
+
+    @staticmethod
+    def header(events: list[StageEvent]) -> str:
+        metrics = []
+        for event in events:
+            desc = event.location or event.media_type
+            metric = event.stage
+            if desc is not None:
+                metric += f';desc="{desc}"'
+            metrics.append(f"{metric};dur={event.duration * 1000:.3f}")
+        return ", ".join(metrics)
+
+    @abc.abstractmethod
+    def set_header(self, response, name: str, value: str):
+        """Sets the header on the response, returns the response."""